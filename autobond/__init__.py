@@ -1,3 +1,4 @@
+from .daemon import run_daemon
 from .runner import run
 
-__all__ = ["run"]
+__all__ = ["run", "run_daemon"]
@@ -0,0 +1,176 @@
+"""
+失败现场留存
+
+失败时只在流程线程里做最轻的事：视口截图与 DOM 快照取回内存后交给后台线程，
+压缩、写盘与清理都不占用重试前的时间。目录按总大小与文件年龄滚动清理，长期运行磁盘占用保持平稳。
+
+可选的 Playwright trace 按时间窗口分段录制，只保留最近一段，失败时保存该段。
+"""
+import atexit
+import gzip
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from .config import AppConfig
+
+if TYPE_CHECKING:
+    from playwright.sync_api import BrowserContext
+
+_STOP = object()
+# 暂存文件（以 . 开头）超过这个时间仍未移入，视为遗留（进程中途退出等），清理时删除
+STAGING_MAX_AGE_SECONDS = 3600
+
+
+class ArtifactWriter:
+    def __init__(self, directory: str, max_bytes: int, max_age_seconds: int, max_pending: int = 32):
+        """
+        Args:
+            directory: 留存目录
+            max_bytes: 目录总大小上限，超出时从最旧的文件开始删除
+            max_age_seconds: 文件最长保留时间
+            max_pending: 等待写盘的上限，写盘跟不上时丢弃新的现场而不是阻塞流程
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop, name="artifact-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, name: str, data: bytes, compress: bool = False) -> None:
+        """
+        交给后台线程写入，立即返回
+
+        Args:
+            name: 文件名，compress 时自动追加 .gz
+            data: 文件内容
+            compress: 是否 gzip 压缩（适合 HTML 等文本）
+        """
+        self._put((name, data, compress))
+
+    def submit_file(self, name: str, path: str) -> None:
+        """把已写好的临时文件移入留存目录"""
+        self._put((name, Path(path), False))
+
+    def staging_path(self, name: str) -> str:
+        """供 Playwright 直接写文件（如 trace）的临时路径，写完后用 submit_file 移入"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return str(self.directory / f".{name}.{threading.get_ident()}.tmp")
+
+    def close(self) -> None:
+        """等待已提交的现场写完"""
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _put(self, item: tuple) -> None:
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            print(f"失败现场写盘积压，丢弃: {item[0]}")
+            payload = item[1]
+            if isinstance(payload, Path):
+                # 丢弃的暂存文件不会再被移入，也不计入大小限制，当场删除
+                payload.unlink(missing_ok=True)
+
+    def _loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            name, payload, compress = item
+            try:
+                path = self._write(name, payload, compress)
+                print(f"失败现场已保存: {path}")
+                self._prune()
+            except Exception as exc:
+                print(f"失败现场保存失败 {name}: {exc}")
+
+    def _write(self, name: str, payload, compress: bool) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        target = self.directory / (name + ".gz" if compress else name)
+        if isinstance(payload, Path):
+            os.replace(payload, target)
+            return target
+
+        tmp_path = self.directory / f".{target.name}.tmp"
+        tmp_path.write_bytes(gzip.compress(payload, compresslevel=6) if compress else payload)
+        os.replace(tmp_path, target)
+        return target
+
+    def _prune(self) -> None:
+        now = time.time()
+        files = []
+        for path in self.directory.iterdir():
+            if not path.is_file():
+                continue
+            stat = path.stat()
+            if path.name.startswith("."):
+                # 暂存文件可能正在写入，只清理明显遗留的
+                if now - stat.st_mtime > STAGING_MAX_AGE_SECONDS:
+                    path.unlink(missing_ok=True)
+                continue
+            if now - stat.st_mtime > self.max_age_seconds:
+                path.unlink(missing_ok=True)
+            else:
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+class TraceRecorder:
+    """
+    Playwright trace 的滚动录制
+
+    trace 按 window_seconds 分段，在流程的阶段边界调用 rotate_if_stale 丢弃过旧的一段，
+    失败时保存的是最近一段（不少于当前阶段），而不是整个上下文从头到尾的记录。
+    """
+
+    def __init__(self, context: "BrowserContext", window_seconds: int):
+        self.context = context
+        self.window_seconds = window_seconds
+        context.tracing.start(screenshots=True, snapshots=True)
+        self._start_chunk()
+
+    def rotate_if_stale(self) -> None:
+        if time.monotonic() - self._chunk_started < self.window_seconds:
+            return
+        try:
+            self.context.tracing.stop_chunk()
+            self._start_chunk()
+        except Exception as exc:
+            print(f"trace 分段失败: {exc}")
+
+    def save(self, path: str) -> bool:
+        try:
+            self.context.tracing.stop_chunk(path=path)
+            return True
+        except Exception as exc:
+            print(f"trace 保存失败: {exc}")
+            return False
+
+    def _start_chunk(self) -> None:
+        self.context.tracing.start_chunk()
+        self._chunk_started = time.monotonic()
+
+
+def create_artifact_writer(config: AppConfig) -> ArtifactWriter:
+    return ArtifactWriter(
+        config.screenshot_dir,
+        max_bytes=config.artifact_max_mb * 1024 * 1024,
+        max_age_seconds=config.artifact_max_age_days * 86400,
+    )
@@ -0,0 +1,64 @@
+import json
+import os
+import threading
+from dataclasses import asdict
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Optional
+
+from .bond_table import Bond
+
+
+class AvailabilityCache:
+    """
+    按日期保存当天的可申购列表
+
+    可申购债券对所有账号都一样：第一个账号从申购列表接口拿到结果后写入，
+    当天列表为空时，后续账号与后续运行（如 13:30 那一轮）直接跳过登录与申购页。
+    """
+
+    def __init__(self, directory: str, keep_days: int = 7):
+        self.directory = Path(directory)
+        self.keep_days = keep_days
+
+    def load(self, day: date) -> Optional[list[Bond]]:
+        """
+        Returns:
+            当天已确认的债券列表，未确认或文件损坏时返回 None
+        """
+        try:
+            payload = json.loads(self._path(day).read_text(encoding="utf-8"))
+            return [Bond(**item) for item in payload["bonds"]]
+        except FileNotFoundError:
+            return None
+        except Exception:
+            self._path(day).unlink(missing_ok=True)
+            return None
+
+    def known_empty(self, day: date) -> bool:
+        """当天已确认没有可申购的债券"""
+        return self.load(day) == []
+
+    def save(self, day: date, bonds: list[Bond]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(day)
+        # 并发账号可能同时写同一天，临时文件按线程区分
+        tmp_path = path.with_suffix(f".{os.getpid()}-{threading.get_ident()}.tmp")
+        tmp_path.write_text(
+            json.dumps({"date": day.isoformat(), "bonds": [asdict(bond) for bond in bonds]}, ensure_ascii=False),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, path)
+        self._prune(day)
+
+    def _prune(self, today: date) -> None:
+        oldest = today - timedelta(days=self.keep_days)
+        for path in self.directory.glob("*.json"):
+            try:
+                if date.fromisoformat(path.stem) < oldest:
+                    path.unlink()
+            except (ValueError, OSError):
+                continue
+
+    def _path(self, day: date) -> Path:
+        return self.directory / f"{day.isoformat()}.json"
@@ -0,0 +1,54 @@
+from collections import Counter
+
+from playwright.sync_api import BrowserContext, Request, Response, Route
+
+NEVER_BLOCKED_TYPES = {"document", "xhr", "fetch"}
+
+
+class ResourceBlocker:
+    def __init__(self, blocked_types: tuple[str, ...], blocked_url_patterns: tuple[str, ...], allow_patterns=()):
+        self.blocked_types = set(blocked_types)
+        self.blocked_url_patterns = blocked_url_patterns
+        # 允许通过的地址（正则），例如验证码图片
+        self.allow_patterns = tuple(allow_patterns)
+        self.blocked = Counter()
+        self.allowed_requests = 0
+        self.allowed_bytes = 0
+
+    def attach(self, context: BrowserContext) -> None:
+        context.route("**/*", self._handle)
+        context.on("response", self._on_response)
+
+    def should_block(self, request: Request) -> bool:
+        url = request.url
+        if request.resource_type in NEVER_BLOCKED_TYPES:
+            return False
+        if any(pattern.search(url) for pattern in self.allow_patterns):
+            return False
+        if request.resource_type in self.blocked_types:
+            return True
+        url = url.lower()
+        return any(pattern in url for pattern in self.blocked_url_patterns)
+
+    def summary(self) -> str:
+        blocked_total = sum(self.blocked.values())
+        detail = ", ".join(f"{kind}={count}" for kind, count in self.blocked.most_common())
+        return (
+            f"已拦截 {blocked_total} 个请求 ({detail or '无'})，"
+            f"放行 {self.allowed_requests} 个请求，共 {self.allowed_bytes / 1024:.1f} KB"
+        )
+
+    def _handle(self, route: Route) -> None:
+        request = route.request
+        if self.should_block(request):
+            self.blocked[request.resource_type] += 1
+            route.abort("blockedbyclient")
+            return
+        route.continue_()
+
+    def _on_response(self, response: Response) -> None:
+        self.allowed_requests += 1
+        try:
+            self.allowed_bytes += int(response.headers.get("content-length", 0))
+        except ValueError:
+            pass
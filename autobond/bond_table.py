@@ -0,0 +1,171 @@
+"""
+申购列表的批量读写
+
+整张表的状态读取、勾选与校验都在一次 page.evaluate 中完成，
+耗时不随可申购债券数量增长。
+
+申购页的表格由 GetConvertibleBondList 接口的 JSON 填充，BondListListener 直接截获这份数据，
+不必等表格渲染、也不依赖表格结构就能判断当天有没有可申购的债券。
+"""
+import re
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+
+# Bond 与 parse_bond_list 也被运行前的可申购缓存用到，不在这里导入 Playwright
+if TYPE_CHECKING:
+    from playwright.sync_api import Page, Response
+
+# 批量申购页加载可申购列表的接口，形如 /Trade/GetConvertibleBondListV2
+BOND_LIST_URL_PATTERN = re.compile(r"/Trade/GetConvertibleBondList", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class Bond:
+    code: str
+    name: str
+    # 申购上限（张）
+    quota: int
+    status: str
+
+    def describe(self) -> str:
+        text = f"{self.code} {self.name}".strip()
+        details = [f"上限 {self.quota} 张"] if self.quota else []
+        if self.status:
+            details.append(self.status)
+        return f"{text}（{'，'.join(details)}）" if details else text
+
+
+@dataclass(frozen=True)
+class BondRow:
+    code: str
+    name: str
+    enabled: bool
+    checked: bool
+
+
+_SNAPSHOT = """
+const snapshot = () => Array.from(
+    document.querySelectorAll("#tableBody tr")
+).flatMap((tr) => {
+    const checkbox = tr.querySelector("input[name='chkitem']");
+    if (!checkbox) return [];
+    const cells = Array.from(tr.cells).map((td) => td.innerText.replace(/\\s+/g, ' ').trim());
+    // 代码列为 6 位数字，名称在其后一列
+    const codeIndex = cells.findIndex((text) => /^\\d{6}$/.test(text));
+    return [{
+        code: codeIndex >= 0 ? cells[codeIndex] : (checkbox.value || ''),
+        name: codeIndex >= 0 && cells[codeIndex + 1] ? cells[codeIndex + 1] : '',
+        enabled: !checkbox.disabled,
+        checked: checkbox.checked,
+    }];
+});
+"""
+
+_READ_TABLE = "() => {" + _SNAPSHOT + "return snapshot(); }"
+
+# 先用页面自带的全选，再逐行补勾仍未勾上的可选行；在页面内 click 会触发页面自身的事件处理。
+_CHECK_ALL = "() => {" + _SNAPSHOT + """
+const selectAll = document.querySelector('#chk_all');
+if (selectAll && !selectAll.checked) selectAll.click();
+for (const checkbox of document.querySelectorAll("#tableBody input[name='chkitem']")) {
+    if (!checkbox.disabled && !checkbox.checked) checkbox.click();
+}
+return snapshot();
+}"""
+
+
+def read_bond_table(page: "Page") -> list[BondRow]:
+    """读取申购列表中所有带勾选框的行"""
+    return [BondRow(**row) for row in page.evaluate(_READ_TABLE)]
+
+
+def check_all_rows(page: "Page") -> list[BondRow]:
+    """勾选所有可选行，返回勾选后的表格状态"""
+    return [BondRow(**row) for row in page.evaluate(_CHECK_ALL)]
+
+
+class BondListListener:
+    """监听申购页的可申购列表接口，需在打开申购页之前创建"""
+
+    def __init__(self, page: "Page"):
+        self.page = page
+        self.latest: Optional["Response"] = None
+        page.on("response", self._on_response)
+        page.on("framenavigated", self._on_navigated)
+
+    def _on_response(self, response: "Response") -> None:
+        if is_bond_list_response(response):
+            self.latest = response
+
+    def _on_navigated(self, frame) -> None:
+        # 换了页面（如会话失效后重新登录）就只认新页面自己的接口返回
+        if frame == self.page.main_frame:
+            self.latest = None
+
+    def wait(self, timeout_ms: int) -> Optional[list[Bond]]:
+        """
+        等待并解析可申购列表
+
+        Returns:
+            债券列表，空列表表示当天没有可申购的债券；接口未出现或无法解析时返回 None
+        """
+        try:
+            return parse_bond_list(self._response(timeout_ms).json())
+        except Exception as exc:
+            print(f"未获取到可申购列表接口数据，改为读取页面表格: {exc}")
+            return None
+
+    def confirms_login(self, timeout_ms: int) -> bool:
+        """列表接口正常返回（Status 为 0）说明当前页面处于登录状态；会话失效时接口报错或返回登录页"""
+        try:
+            payload = self._response(timeout_ms).json()
+        except Exception:
+            return False
+        return isinstance(payload, dict) and payload.get("Status") in (0, "0")
+
+    def _response(self, timeout_ms: int) -> "Response":
+        if self.latest is None:
+            self.latest = self.page.wait_for_event("response", is_bond_list_response, timeout=timeout_ms)
+        return self.latest
+
+
+def is_bond_list_response(response: "Response") -> bool:
+    return response.request.resource_type in {"xhr", "fetch"} and bool(BOND_LIST_URL_PATTERN.search(response.url))
+
+
+def parse_bond_list(payload: dict) -> list[Bond]:
+    """
+    解析可申购列表接口的返回
+
+    Args:
+        payload: 形如 {"Status": 0, "Data": [{"SUBCODE": ..., "SUBNAME": ..., "LIMITBUYVOL": ..., "STATUS": ...}]}
+
+    Returns:
+        Bond 列表
+    """
+    if not isinstance(payload, dict) or payload.get("Status") not in (0, "0"):
+        raise ValueError(f"接口返回异常: {payload!r:.200}")
+
+    # 缺少 Data 或为 null 不能当成空列表，否则会被可申购缓存记为“今日无债”，后续账号全部跳过
+    data = payload.get("Data")
+    if not isinstance(data, list):
+        raise ValueError(f"Data 字段格式异常: {data!r:.200}")
+
+    bonds = []
+    for item in data:
+        code = str(item.get("SUBCODE") or "").strip()
+        if not code:
+            raise ValueError(f"缺少 SUBCODE 字段: {item!r:.200}")
+        try:
+            quota = int(float(item.get("LIMITBUYVOL") or 0))
+        except (TypeError, ValueError):
+            quota = 0
+        bonds.append(
+            Bond(
+                code=code,
+                name=str(item.get("SUBNAME") or "").strip(),
+                quota=quota,
+                status=str(item.get("STATUS") or "").strip(),
+            )
+        )
+    return bonds
@@ -1,5 +1,23 @@
 import os
 from dataclasses import dataclass
+from datetime import time
+
+DEFAULT_PUSHPLUS_URL = "https://www.pushplus.plus/send"
+
+# 流程用不到的资源类型；document/xhr/fetch/script/stylesheet 不拦截，
+# 样式表决定元素是否 :visible，拦掉会让弹窗判断失效。
+DEFAULT_BLOCKED_TYPES = ("image", "media", "font")
+
+# 统计、广告等第三方地址，按子串匹配
+DEFAULT_BLOCKED_URL_PATTERNS = (
+    "hm.baidu.com",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "cnzz.com",
+    "growingio.com",
+    "sensorsdata",
+    "bdstatic.com",
+)
 
 
 @dataclass(frozen=True)
@@ -12,12 +30,49 @@ class UserCredential:
 class AppConfig:
     users: list[UserCredential]
     pushplus_token: str
+    pushplus_url: str
+    notify_digest: bool
+    notify_retries: int
     headless: bool
     browser: str
+    base_url: str
     captcha_retries: int
+    captcha_warmup: bool
+    captcha_min_confidence: float
+    captcha_capture: str
+    captcha_batch_window_ms: int
+    captcha_dataset_dir: str
     flow_retries: int
     timeout_ms: int
     screenshot_dir: str
+    artifact_max_mb: int
+    artifact_max_age_days: int
+    artifact_trace: bool
+    artifact_trace_seconds: int
+    trace_file: str
+    metrics_file: str
+    session_dir: str
+    session_key: str
+    session_max_age_hours: int
+    max_concurrency: int
+    context_prewarm: bool
+    block_resources: bool
+    blocked_resource_types: tuple[str, ...]
+    blocked_url_patterns: tuple[str, ...]
+    schedule_times: tuple[time, ...]
+    schedule_timezone: str
+    browser_recycle_runs: int
+    trade_calendar: bool
+    trade_calendar_file: str
+    trade_calendar_verify: bool
+    availability_dir: str
+    force_bond_check: bool
+    adaptive_timeouts: bool
+    latency_stats_file: str
+    history_db: str
+    timeout_floor_ms: int
+    timeout_ceiling_ms: int
+    run_deadline_seconds: int
 
 
 def parse_users(users_str: str) -> list[UserCredential]:
@@ -58,16 +113,99 @@ def parse_int(value: str, default: int, minimum: int = 1) -> int:
     return max(parsed, minimum)
 
 
+def parse_float(value: str, default: float, minimum: float, maximum: float) -> float:
+    try:
+        parsed = float(value)
+    except (TypeError, ValueError):
+        parsed = default
+    return min(max(parsed, minimum), maximum)
+
+
+def parse_choice(value: str, choices: set[str], default: str) -> str:
+    if value is None:
+        return default
+    value = value.strip().lower()
+    return value if value in choices else default
+
+
+def parse_list(value: str, default: tuple[str, ...]) -> tuple[str, ...]:
+    if value is None or not value.strip():
+        return default
+    return tuple(item.strip().lower() for item in value.split(",") if item.strip())
+
+
+def parse_times(value: str, default: str) -> tuple[time, ...]:
+    if value is None or not value.strip():
+        value = default
+
+    times = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            hour, minute = item.split(":")
+            times.append(time(int(hour), int(minute)))
+        except ValueError:
+            raise ValueError(f"时间格式错误: {item}，应为 HH:MM") from None
+    if not times:
+        raise ValueError("未设置运行时间，格式: 09:30,13:30")
+    return tuple(sorted(set(times)))
+
+
 def load_config() -> AppConfig:
     users = parse_users(os.environ.get("USERS", ""))
 
     return AppConfig(
         users=users,
         pushplus_token=os.environ.get("PUSHPLUS_TOKEN", "").strip(),
+        pushplus_url=os.environ.get("PUSHPLUS_URL", DEFAULT_PUSHPLUS_URL).strip(),
+        notify_digest=parse_bool(os.environ.get("NOTIFY_DIGEST"), default=False),
+        notify_retries=parse_int(os.environ.get("NOTIFY_RETRIES"), default=3),
         headless=parse_bool(os.environ.get("HEADLESS"), default=False),
         browser=os.environ.get("BROWSER", "chromium").strip().lower(),
+        base_url=os.environ.get("TRADE_BASE_URL", "https://jywg.18.cn").strip().rstrip("/"),
+        captcha_capture=parse_choice(
+            os.environ.get("CAPTCHA_CAPTURE"), choices={"screenshot", "response"}, default="screenshot"
+        ),
+        captcha_batch_window_ms=parse_int(os.environ.get("CAPTCHA_BATCH_WINDOW_MS"), default=0, minimum=0),
+        captcha_dataset_dir=os.environ.get("CAPTCHA_DATASET_DIR", "").strip(),
         captcha_retries=parse_int(os.environ.get("CAPTCHA_RETRIES"), default=3),
+        captcha_warmup=parse_bool(os.environ.get("CAPTCHA_WARMUP"), default=True),
+        captcha_min_confidence=parse_float(
+            os.environ.get("CAPTCHA_MIN_CONFIDENCE"), default=0.0, minimum=0.0, maximum=1.0
+        ),
         flow_retries=parse_int(os.environ.get("FLOW_RETRIES"), default=2),
         timeout_ms=parse_int(os.environ.get("TIMEOUT_MS"), default=30000, minimum=3000),
         screenshot_dir=os.environ.get("SCREENSHOT_DIR", "artifacts/screenshots").strip(),
+        artifact_max_mb=parse_int(os.environ.get("ARTIFACT_MAX_MB"), default=200),
+        artifact_max_age_days=parse_int(os.environ.get("ARTIFACT_MAX_AGE_DAYS"), default=7),
+        artifact_trace=parse_bool(os.environ.get("ARTIFACT_TRACE"), default=False),
+        artifact_trace_seconds=parse_int(os.environ.get("ARTIFACT_TRACE_SECONDS"), default=30),
+        trace_file=os.environ.get("TRACE_FILE", "").strip(),
+        metrics_file=os.environ.get("METRICS_FILE", "").strip(),
+        session_dir=os.environ.get("SESSION_DIR", "").strip(),
+        session_key=os.environ.get("SESSION_KEY", "").strip(),
+        session_max_age_hours=parse_int(os.environ.get("SESSION_MAX_AGE_HOURS"), default=12),
+        max_concurrency=parse_int(os.environ.get("MAX_CONCURRENCY"), default=1),
+        context_prewarm=parse_bool(os.environ.get("CONTEXT_PREWARM"), default=True),
+        block_resources=parse_bool(os.environ.get("BLOCK_RESOURCES"), default=False),
+        blocked_resource_types=parse_list(os.environ.get("BLOCK_RESOURCE_TYPES"), default=DEFAULT_BLOCKED_TYPES),
+        blocked_url_patterns=parse_list(
+            os.environ.get("BLOCK_URL_PATTERNS"), default=DEFAULT_BLOCKED_URL_PATTERNS
+        ),
+        schedule_times=parse_times(os.environ.get("SCHEDULE_TIMES"), default="09:30,13:30"),
+        schedule_timezone=os.environ.get("SCHEDULE_TIMEZONE", "Asia/Shanghai").strip() or "Asia/Shanghai",
+        browser_recycle_runs=parse_int(os.environ.get("BROWSER_RECYCLE_RUNS"), default=10),
+        trade_calendar=parse_bool(os.environ.get("TRADE_CALENDAR"), default=True),
+        trade_calendar_file=os.environ.get("TRADE_CALENDAR_FILE", "").strip(),
+        trade_calendar_verify=parse_bool(os.environ.get("TRADE_CALENDAR_VERIFY"), default=True),
+        availability_dir=os.environ.get("AVAILABILITY_CACHE_DIR", "artifacts/availability").strip(),
+        force_bond_check=parse_bool(os.environ.get("FORCE_BOND_CHECK"), default=False),
+        adaptive_timeouts=parse_bool(os.environ.get("ADAPTIVE_TIMEOUTS"), default=True),
+        latency_stats_file=os.environ.get("LATENCY_STATS_FILE", "artifacts/latency.json").strip(),
+        history_db=os.environ.get("HISTORY_DB", "artifacts/history.db").strip(),
+        timeout_floor_ms=parse_int(os.environ.get("TIMEOUT_FLOOR_MS"), default=500, minimum=100),
+        timeout_ceiling_ms=parse_int(os.environ.get("TIMEOUT_CEILING_MS"), default=15000, minimum=1000),
+        run_deadline_seconds=parse_int(os.environ.get("RUN_DEADLINE_SECONDS"), default=0, minimum=0),
     )
@@ -0,0 +1,70 @@
+"""
+预热的浏览器上下文
+
+每个账号每次尝试都要新建上下文、新建页面、打开登录页，这段时间原本串行地落在每个账号的关键路径上。
+ContextPool 提前为下一次尝试准备好上下文：建好页面、挂好监听，再用 location.href 发起登录页导航。
+这次 evaluate 不等页面加载就返回，登录页与验证码在浏览器里加载，当前账号照常继续。
+轮到下一个账号时，登录表单通常已经渲染好。
+
+上下文仍然一次尝试一个、用完即关，账号之间不共享 Cookie 与缓存。
+"""
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Optional
+
+if TYPE_CHECKING:
+    from playwright.sync_api import BrowserContext, Page
+
+    from .blocking import ResourceBlocker
+    from .purchaser import CaptchaResponseListener
+
+
+@dataclass
+class PreparedContext:
+    context: "BrowserContext"
+    page: "Page"
+    blocker: Optional["ResourceBlocker"]
+    captcha_responses: Optional["CaptchaResponseListener"]
+    # 是否已发起登录页导航
+    navigated: bool
+    created_at: float = field(default_factory=time.monotonic)
+
+    def close(self) -> None:
+        try:
+            self.context.close()
+        except Exception:
+            pass
+
+
+class ContextPool:
+    def __init__(self, create: Callable[[], PreparedContext], max_age_seconds: float = 60):
+        """
+        Args:
+            create: 新建一个已发起登录页导航的上下文
+            max_age_seconds: 预热的上下文闲置超过该时间就丢弃重建，避免验证码过期
+        """
+        self.create = create
+        self.max_age_seconds = max_age_seconds
+        self._ready: Optional[PreparedContext] = None
+
+    def acquire(self) -> PreparedContext:
+        """取出预热好的上下文，没有或已过期时当场新建；调用方负责关闭"""
+        prepared, self._ready = self._ready, None
+        if prepared is not None and time.monotonic() - prepared.created_at > self.max_age_seconds:
+            prepared.close()
+            prepared = None
+        return prepared or self.create()
+
+    def prefill(self) -> None:
+        """为下一次尝试预热一个上下文；已有时不重复创建"""
+        if self._ready is not None:
+            return
+        try:
+            self._ready = self.create()
+        except Exception as exc:
+            print(f"预热浏览器上下文失败: {exc}")
+
+    def close(self) -> None:
+        if self._ready is not None:
+            self._ready.close()
+            self._ready = None
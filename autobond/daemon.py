@@ -0,0 +1,133 @@
+"""
+常驻模式
+
+进程启动后预热验证码模型并启动浏览器，之后按计划时间（默认北京时间工作日 9:30 / 13:30）
+在同一进程内执行申购，每轮不再承担 Python、TensorFlow、模型与浏览器的冷启动。
+浏览器每执行 BROWSER_RECYCLE_RUNS 轮重启一次，避免长时间运行内存持续增长；
+重启在一轮结束后立即进行，下一轮开始时浏览器已就绪。
+收到 SIGTERM / SIGINT 时不会打断正在进行的申购，本轮结束后退出。
+
+用法:
+    python main.py --daemon
+"""
+import signal
+import threading
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Optional
+
+from dotenv import load_dotenv
+
+from .config import AppConfig, load_config
+from .runner import launch_browser_timed, run_once
+from .trade_calendar import TradeCalendar, load_calendar, resolve_timezone
+
+if TYPE_CHECKING:
+    from playwright.sync_api import Browser, Playwright
+
+
+def next_run_time(now: datetime, config: AppConfig, calendar: Optional[TradeCalendar] = None) -> datetime:
+    """now 之后最近的一个计划时间，跳过周末与交易日历中的休市日"""
+    for days in range(32):
+        day = now.date() + timedelta(days=days)
+        if day.weekday() >= 5:
+            continue
+        if calendar is not None and calendar.is_trading_day(day) is False:
+            continue
+        for at in config.schedule_times:
+            candidate = datetime.combine(day, at, tzinfo=now.tzinfo)
+            if candidate > now:
+                return candidate
+    raise RuntimeError("未找到下一次运行时间，请检查 SCHEDULE_TIMES")
+
+
+class Daemon:
+    def __init__(self, config: AppConfig):
+        self.config = config
+        self.tz = resolve_timezone(config.schedule_timezone)
+        self.calendar = self._load_calendar()
+        self.browser: Optional["Browser"] = None
+        self.runs_on_browser = 0
+        self._stop = threading.Event()
+
+    def _load_calendar(self) -> Optional[TradeCalendar]:
+        if not self.config.trade_calendar:
+            return None
+        try:
+            return load_calendar(self.config.trade_calendar_file)
+        except Exception as exc:
+            print(f"交易日历读取失败，只跳过周末: {exc}")
+            return None
+
+    def stop(self, *_) -> None:
+        self._stop.set()
+
+    def serve(self) -> None:
+        from playwright.sync_api import sync_playwright
+
+        with sync_playwright() as playwright:
+            try:
+                while not self._stop.is_set():
+                    self._ensure_browser(playwright)
+                    next_at = next_run_time(datetime.now(self.tz), self.config, self.calendar)
+                    print(f"下次运行: {next_at:%Y-%m-%d %H:%M %Z}")
+                    if not self._sleep_until(next_at):
+                        break
+
+                    self._ensure_browser(playwright)
+                    try:
+                        run_once(self.config, browser=self.browser)
+                    except Exception as exc:
+                        print(f"本轮运行失败: {exc}")
+
+                    self.runs_on_browser += 1
+                    if self.runs_on_browser >= self.config.browser_recycle_runs:
+                        print(f"浏览器已连续运行 {self.runs_on_browser} 轮，重启")
+                        self._close_browser()
+            finally:
+                self._close_browser()
+        print("常驻模式已退出")
+
+    def _ensure_browser(self, playwright: "Playwright") -> None:
+        if self.browser is not None and self.browser.is_connected():
+            return
+        if self.browser is not None:
+            print("浏览器连接已断开，重新启动")
+        self.browser = launch_browser_timed(playwright, self.config)
+        self.runs_on_browser = 0
+
+    def _close_browser(self) -> None:
+        if self.browser is None:
+            return
+        try:
+            self.browser.close()
+        except Exception as exc:
+            print(f"关闭浏览器失败: {exc}")
+        self.browser = None
+
+    def _sleep_until(self, at: datetime) -> bool:
+        """等到 at，期间收到停止信号返回 False；分段等待，系统休眠或对时后也能按墙上时间醒来"""
+        while not self._stop.is_set():
+            remaining = (at - datetime.now(self.tz)).total_seconds()
+            if remaining <= 0:
+                return True
+            self._stop.wait(min(remaining, 60))
+        return False
+
+
+def run_daemon() -> None:
+    load_dotenv()
+    config = load_config()
+
+    schedule = ", ".join(at.strftime("%H:%M") for at in config.schedule_times)
+    print(f"常驻模式，计划时间: {schedule}（{config.schedule_timezone}，交易日）")
+    print(f"浏览器: {config.browser}, Headless: {config.headless}")
+
+    from .purchaser import start_recognizer_warmup
+
+    # 常驻进程里模型只加载一次，不受 CAPTCHA_WARMUP 影响
+    start_recognizer_warmup(config.captcha_batch_window_ms)
+
+    daemon = Daemon(config)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    daemon.serve()
@@ -0,0 +1,276 @@
+"""
+运行历史
+
+每轮运行结束时把各账号的结果、尝试次数、验证码次数与各阶段耗时写入本地 SQLite，
+报告按天给出耗时 p50/p95 趋势，并把最近一次明显慢于（或重试多于）历史基线的账号与阶段标出来，
+站点改版导致的变慢能在错过申购窗口之前被发现：
+
+    python -m autobond.history [--db artifacts/history.db] [--days 14] [--window 10]
+
+多个分片进程可以写同一个数据库，SQLite 自带文件锁。
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from .tracing import Span, percentile
+
+DEFAULT_HISTORY_DB = "artifacts/history.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    day TEXT NOT NULL,
+    accounts INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS account_runs (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    account TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    message TEXT NOT NULL,
+    duration REAL,
+    attempts INTEGER NOT NULL,
+    captcha_attempts INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS phases (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    account TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    duration REAL NOT NULL,
+    count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS account_runs_account ON account_runs(account, run_id);
+CREATE INDEX IF NOT EXISTS phases_run ON phases(run_id);
+"""
+
+
+def connect(path: str) -> sqlite3.Connection:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    # 分片进程同时写入时等待对方释放锁
+    connection = sqlite3.connect(path, timeout=30)
+    connection.executescript(_SCHEMA)
+    return connection
+
+
+def record_run(path: str, started_at: float, results: dict[str, str], spans: list[Span]) -> None:
+    """
+    写入一轮运行
+
+    Args:
+        path: 数据库文件
+        started_at: 本轮开始时间（Unix 时间戳）
+        results: 账号 -> 结果消息
+        spans: 本轮记录的 span
+    """
+    accounts: dict[str, dict] = {
+        account: {"outcome": "ok", "duration": None, "attempts": 0, "captcha_attempts": 0}
+        for account in results
+    }
+    phases: dict[tuple[str, str], list[float]] = defaultdict(list)
+    for span in spans:
+        account = span.attributes.get("account")
+        if account not in accounts:
+            continue
+        row = accounts[account]
+        if span.name == "account":
+            row["duration"] = span.duration
+            row["outcome"] = span.outcome
+            continue
+        row["attempts"] = max(row["attempts"], span.attributes.get("attempt", 0))
+        if span.name == "captcha":
+            row["captcha_attempts"] += span.attributes.get("captcha_attempts", 0)
+        phases[(account, span.name)].append(span.duration)
+
+    finished_at = time.time()
+    with connect(path) as connection:
+        run_id = connection.execute(
+            "INSERT INTO runs (started_at, finished_at, day, accounts) VALUES (?, ?, ?, ?)",
+            (started_at, finished_at, datetime.fromtimestamp(started_at).date().isoformat(), len(results)),
+        ).lastrowid
+        connection.executemany(
+            "INSERT INTO account_runs VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (run_id, account, row["outcome"], results[account], row["duration"], row["attempts"],
+                 row["captcha_attempts"])
+                for account, row in accounts.items()
+            ],
+        )
+        connection.executemany(
+            "INSERT INTO phases VALUES (?, ?, ?, ?, ?)",
+            [(run_id, account, phase, sum(durations), len(durations)) for (account, phase), durations in phases.items()],
+        )
+    connection.close()
+
+
+def report(
+    path: str,
+    days: int = 14,
+    window: int = 10,
+    factor: float = 1.5,
+    min_delta: float = 2.0,
+) -> list[str]:
+    """
+    打印趋势与回退报告
+
+    Args:
+        path: 数据库文件
+        days: 趋势表覆盖最近多少天
+        window: 基线取此前多少次（账号）或多少天（阶段）
+        factor: 超过基线 p50 的倍数才算变慢
+        min_delta: 同时至少慢这么多秒，避免毫秒级阶段的抖动被当成回退
+
+    Returns:
+        回退项描述，没有时为空列表
+    """
+    with connect(path) as connection:
+        _print_trend(connection, days)
+        regressions = _account_regressions(connection, window, factor, min_delta)
+        regressions += _phase_regressions(connection, window, factor, min_delta)
+    connection.close()
+
+    print()
+    if regressions:
+        print(f"发现 {len(regressions)} 项回退:")
+        for line in regressions:
+            print(f"  ! {line}")
+    else:
+        print("未发现回退")
+    return regressions
+
+
+def _print_trend(connection: sqlite3.Connection, days: int) -> None:
+    rows = connection.execute(
+        """
+        SELECT runs.day, account_runs.duration, account_runs.outcome, account_runs.attempts,
+               account_runs.captcha_attempts
+        FROM account_runs JOIN runs ON runs.id = account_runs.run_id
+        WHERE runs.day >= date('now', 'localtime', ?)
+        ORDER BY runs.day
+        """,
+        (f"-{days - 1} days",),
+    ).fetchall()
+
+    by_day: dict[str, list[tuple]] = defaultdict(list)
+    for day, *values in rows:
+        by_day[day].append(values)
+
+    print(f"最近 {days} 天（账号耗时单位: 秒）:")
+    print(f"  {'日期':<10}  {'账号次数':>8}  {'失败':>4}  {'p50':>7}  {'p95':>7}  {'平均尝试':>8}  {'平均验证码':>10}")
+    for day, values in by_day.items():
+        durations = [duration for duration, *_ in values if duration is not None]
+        failures = sum(1 for _, outcome, *_ in values if outcome == "error")
+        p50 = f"{percentile(durations, 0.5):.2f}" if durations else "-"
+        p95 = f"{percentile(durations, 0.95):.2f}" if durations else "-"
+        attempts = sum(value[2] for value in values) / len(values)
+        captcha_attempts = sum(value[3] for value in values) / len(values)
+        print(
+            f"  {day:<10}  {len(values):>8}  {failures:>4}  {p50:>7}  {p95:>7}  "
+            f"{attempts:>8.2f}  {captcha_attempts:>10.2f}"
+        )
+
+
+def _account_regressions(connection: sqlite3.Connection, window: int, factor: float, min_delta: float) -> list[str]:
+    """每个账号最近一次与它此前 window 次比较"""
+    rows = connection.execute(
+        """
+        SELECT account, duration, outcome, attempts, captcha_attempts
+        FROM account_runs ORDER BY account, run_id DESC
+        """
+    ).fetchall()
+
+    history: dict[str, list[tuple]] = defaultdict(list)
+    for account, *values in rows:
+        if len(history[account]) <= window:
+            history[account].append(values)
+
+    regressions = []
+    for account, (latest, *baseline) in history.items():
+        if len(baseline) < 3:
+            continue
+        duration, outcome = latest[:2]
+        if outcome == "error" and sum(1 for row in baseline if row[1] == "error") <= len(baseline) // 2:
+            regressions.append(f"[{account}] 最近一次失败，此前 {len(baseline)} 次中多数成功")
+
+        durations = [row[0] for row in baseline if row[0] is not None]
+        slower = _slower(duration, durations, factor, min_delta)
+        if slower:
+            regressions.append(f"[{account}] 账号耗时 {slower}")
+
+        for index, name in ((2, "尝试次数"), (3, "验证码次数")):
+            usual = percentile([row[index] for row in baseline], 0.95)
+            if latest[index] > usual:
+                regressions.append(f"[{account}] {name} {latest[index]}，此前 p95 为 {usual}")
+    return regressions
+
+
+def _phase_regressions(connection: sqlite3.Connection, window: int, factor: float, min_delta: float) -> list[str]:
+    """最近一天各阶段的 p95 与此前 window 天合并的样本比较"""
+    days = [
+        day for (day,) in connection.execute("SELECT DISTINCT day FROM runs ORDER BY day DESC LIMIT ?", (window + 1,))
+    ]
+    if len(days) < 2:
+        return []
+
+    samples: dict[str, dict[bool, list[float]]] = defaultdict(lambda: {True: [], False: []})
+    rows = connection.execute(
+        f"""
+        SELECT runs.day, phases.phase, phases.duration / phases.count
+        FROM phases JOIN runs ON runs.id = phases.run_id
+        WHERE runs.day IN ({','.join('?' * len(days))})
+        """,
+        days,
+    )
+    for day, phase, duration in rows:
+        samples[phase][day == days[0]].append(duration)
+
+    regressions = []
+    for phase, groups in sorted(samples.items()):
+        latest, baseline = groups[True], groups[False]
+        if not latest or len(baseline) < 3:
+            continue
+        slower = _slower(percentile(latest, 0.95), baseline, factor, min_delta)
+        if slower:
+            regressions.append(f"阶段 {phase} {days[0]} p95 {slower}")
+    return regressions
+
+
+def _slower(value: Optional[float], baseline: list[float], factor: float, min_delta: float) -> Optional[str]:
+    """明显慢于基线中位数时返回说明"""
+    if value is None or len(baseline) < 3:
+        return None
+    usual = percentile(baseline, 0.5)
+    if value > usual * factor and value - usual > min_delta:
+        return f"{value:.2f}s，基线 p50 {usual:.2f}s"
+    return None
+
+
+def main(argv=None) -> int:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="运行历史趋势与回退报告")
+    parser.add_argument("--db", default=os.environ.get("HISTORY_DB", DEFAULT_HISTORY_DB), help="历史数据库")
+    parser.add_argument("--days", type=int, default=14, help="趋势表覆盖最近多少天")
+    parser.add_argument("--window", type=int, default=10, help="基线取此前多少次运行（阶段为多少天）")
+    parser.add_argument("--factor", type=float, default=1.5, help="超过基线 p50 多少倍算变慢")
+    parser.add_argument("--min-delta", type=float, default=2.0, help="至少慢多少秒才算变慢")
+    parser.add_argument("--fail-on-regression", action="store_true", help="发现回退时退出码为 1，供 CI 使用")
+    args = parser.parse_args(argv)
+
+    if not args.db or not Path(args.db).exists():
+        print(f"历史数据库不存在: {args.db}")
+        return 1
+    regressions = report(args.db, days=args.days, window=args.window, factor=args.factor, min_delta=args.min_delta)
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
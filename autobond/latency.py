@@ -0,0 +1,126 @@
+"""
+按账号、按等待点记录历史耗时，据此给出超时时间
+
+每个具名等待（如 "bond_list"、"dialog_or_confirm"）在等到目标时记录实际耗时。
+下一次运行取该账号最近样本的 p95 乘以余量作为超时，样本不足时用所有账号的样本，
+仍不足时用代码里的默认值；结果限制在 [floor, ceiling] 之间。
+
+超时的等待记为删失样本（只知道实际耗时不短于已等待的时间），在文件中以负数保存。
+最近 min_samples 个样本里有删失样本时，超时至少取其两倍，估计值只会因超时而变大，
+不会越缩越短、再也等不到目标。
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from .tracing import percentile
+
+# 所有账号合并的样本
+ALL_ACCOUNTS = "*"
+
+
+class LatencyStats:
+    def __init__(
+        self,
+        path: str,
+        floor_ms: int,
+        ceiling_ms: int,
+        quantile: float = 0.95,
+        margin: float = 1.5,
+        min_samples: int = 5,
+        max_samples: int = 50,
+    ):
+        """
+        Args:
+            path: 样本文件，为空时只在内存中统计
+            floor_ms: 超时下限
+            ceiling_ms: 超时上限
+            quantile: 取历史耗时的分位数
+            margin: 在分位数上乘的余量
+            min_samples: 样本数达到该值才据此计算
+            max_samples: 每个账号每个等待点保留的最近样本数
+        """
+        self.path = Path(path) if path else None
+        self.floor_ms = floor_ms
+        self.ceiling_ms = ceiling_ms
+        self.quantile = quantile
+        self.margin = margin
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        # {账号: {等待点: [毫秒, ...]}}
+        self._samples: dict[str, dict[str, list[float]]] = self._read() if self.path else {}
+        self._recorded: list[tuple[str, str, float]] = []
+
+    def timeout_ms(self, account: str, phase: str, default_ms: int) -> int:
+        """该账号该等待点应使用的超时"""
+        with self._lock:
+            samples = self._samples.get(account, {}).get(phase, [])
+            if len(samples) < self.min_samples:
+                samples = self._samples.get(ALL_ACCOUNTS, {}).get(phase, [])
+            if len(samples) < self.min_samples:
+                return default_ms
+            samples = list(samples)
+
+        # 删失样本按已等待的时间计入，是实际耗时的下界
+        value = percentile([abs(sample) for sample in samples], self.quantile) * self.margin
+        censored = [-sample for sample in samples[-self.min_samples:] if sample < 0]
+        if censored:
+            value = max(value, max(censored) * 2)
+        return int(min(max(value, self.floor_ms), self.ceiling_ms))
+
+    def estimate_ms(self, account: str, phase: str) -> Optional[float]:
+        """该账号该阶段的历史中位耗时，没有样本时返回 None"""
+        with self._lock:
+            samples = self._samples.get(account, {}).get(phase) or self._samples.get(ALL_ACCOUNTS, {}).get(phase)
+            if not samples:
+                return None
+            samples = [abs(sample) for sample in samples]
+        return percentile(samples, 0.5)
+
+    def record(self, account: str, phase: str, elapsed_ms: float, timed_out: bool = False) -> None:
+        """
+        Args:
+            elapsed_ms: 实际耗时；timed_out 时为已等待的时间
+            timed_out: 未等到目标，记为删失样本
+        """
+        value = -elapsed_ms if timed_out else elapsed_ms
+        with self._lock:
+            self._append(self._samples, account, phase, value)
+            self._recorded.append((account, phase, value))
+
+    def save(self) -> None:
+        """把本次运行新增的样本合并进文件；重新读取后再合并，分片进程同时写入时不会整体覆盖"""
+        if self.path is None:
+            return
+        with self._lock:
+            recorded, self._recorded = self._recorded, []
+        if not recorded:
+            return
+
+        samples = self._read()
+        for account, phase, elapsed_ms in recorded:
+            self._append(samples, account, phase, elapsed_ms)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(samples, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+    def _append(self, samples: dict, account: str, phase: str, elapsed_ms: float) -> None:
+        for key in (account, ALL_ACCOUNTS):
+            values = samples.setdefault(key, {}).setdefault(phase, [])
+            values.append(round(elapsed_ms, 1))
+            limit = self.max_samples * (4 if key == ALL_ACCOUNTS else 1)
+            del values[:-limit]
+
+    def _read(self) -> dict[str, dict[str, list[float]]]:
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except Exception as exc:
+            print(f"耗时统计文件损坏，重新统计: {exc}")
+            return {}
@@ -1,27 +1,129 @@
+"""
+PushPlus 推送
+
+Notifier 在后台线程里投递消息，申购流程只负责入队，不会被推送接口的耗时拖慢。
+连接通过 requests.Session 复用，网络异常或服务端 5xx 按指数退避重试。
+digest 模式下不逐条推送，close() 时把本次运行的全部结果合并为一条发送。
+close() 会等待队列投递完毕；未显式关闭时由 atexit 兜底。
+"""
+import atexit
+import queue
+import threading
+import time
+from typing import Optional
+
 import requests
 
+from .config import DEFAULT_PUSHPLUS_URL
+
+_STOP = object()
+
+
+class Notifier:
+    def __init__(
+        self,
+        token: str,
+        url: str = DEFAULT_PUSHPLUS_URL,
+        digest: bool = False,
+        retries: int = 3,
+        backoff: float = 1.0,
+        timeout: float = 10,
+    ):
+        """
+        Args:
+            token: PushPlus token，为空时只打印不推送
+            url: 推送接口地址，测试时可指向本地替身
+            digest: 合并为一条消息，在 close() 时发送
+            retries: 单条消息最大重试次数
+            backoff: 首次重试前的等待秒数，之后逐次翻倍
+            timeout: 单次请求超时秒数
+        """
+        self.token = token
+        self.url = url
+        self.digest = digest
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._digest_messages: list[str] = []
+        self._lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        if token:
+            self._thread = threading.Thread(target=self._loop, name="pushplus", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def notify(self, message: str, title: str) -> None:
+        """打印并投递一条消息，立即返回"""
+        print(message)
+        if not self.token:
+            return
+        if self.digest:
+            with self._lock:
+                self._digest_messages.append(message)
+            return
+        self._queue.put((message, title))
+
+    def close(self, title: str = "打新债结果", timeout: Optional[float] = None) -> None:
+        """
+        发送 digest 汇总并等待所有消息投递完成
+
+        Args:
+            title: digest 汇总消息的标题
+            timeout: 最长等待秒数，None 表示一直等到投递结束
+        """
+        with self._lock:
+            if self._closed or self._thread is None:
+                return
+            self._closed = True
+            atexit.unregister(self.close)
+            messages, self._digest_messages = self._digest_messages, []
+
+        if messages:
+            self._queue.put(("\n".join(messages), f"{title}（{len(messages)} 个账号）"))
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            print("推送未在限定时间内完成，剩余消息已放弃")
+
+    def _loop(self) -> None:
+        with requests.Session() as session:
+            session.headers["Content-Type"] = "application/json"
+            while True:
+                item = self._queue.get()
+                if item is _STOP:
+                    return
+                message, title = item
+                self._deliver(session, message, title)
+
+    def _deliver(self, session: requests.Session, message: str, title: str) -> None:
+        payload = {"token": self.token, "title": title, "content": message, "template": "txt"}
+        for attempt in range(1, self.retries + 1):
+            try:
+                response = session.post(self.url, json=payload, timeout=self.timeout)
+                if response.status_code >= 500:
+                    raise RuntimeError(f"HTTP {response.status_code}")
+                result = response.json()
+            except Exception as exc:
+                if attempt == self.retries:
+                    print(f"推送异常: {exc}")
+                    return
+                delay = self.backoff * 2 ** (attempt - 1)
+                print(f"推送异常: {exc}，{delay:g}s 后第 {attempt + 1} 次重试")
+                time.sleep(delay)
+                continue
+
+            if result.get("code") == 200:
+                print(f"推送成功: {result.get('data')}")
+            else:
+                # token 无效、额度用尽等业务错误重试也不会成功
+                print(f"推送失败: [{result.get('code')}] {result.get('msg')}")
+            return
+
 
-def send_pushplus(message: str, title: str, token: str) -> None:
-    print(message)
-    if not token:
-        return
-
-    try:
-        response = requests.post(
-            "https://www.pushplus.plus/send",
-            json={
-                "token": token,
-                "title": title,
-                "content": message,
-                "template": "txt",
-            },
-            headers={"Content-Type": "application/json"},
-            timeout=10,
-        )
-        result = response.json()
-        if result.get("code") == 200:
-            print(f"推送成功: {result.get('data')}")
-        else:
-            print(f"推送失败: [{result.get('code')}] {result.get('msg')}")
-    except Exception as exc:
-        print(f"推送异常: {exc}")
+def send_pushplus(message: str, title: str, token: str, url: str = DEFAULT_PUSHPLUS_URL) -> None:
+    """同步推送单条消息"""
+    notifier = Notifier(token, url=url)
+    notifier.notify(message, title)
+    notifier.close()
@@ -1,26 +1,92 @@
 import re
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
-
-from playwright.sync_api import Browser, Locator, Page, Playwright, TimeoutError as PlaywrightTimeoutError
-
-from captcha import CaptchaRecognizer
-
+from typing import Optional, Union
+
+from playwright.sync_api import (
+    Browser,
+    Frame,
+    Locator,
+    Page,
+    Playwright,
+    Response,
+    TimeoutError as PlaywrightTimeoutError,
+)
+
+from captcha import CaptchaRecognizer, InferenceWorker
+from captcha.dataset import CaptchaDataset
+
+from .artifacts import ArtifactWriter, TraceRecorder, create_artifact_writer
+from .availability import AvailabilityCache
+from .blocking import ResourceBlocker
+from .bond_table import Bond, BondListListener, check_all_rows
 from .config import AppConfig, UserCredential
-
-LOGIN_URL = "https://jywg.18.cn/Login?el=1&clear=&returl=%2fTrade%2fBuy"
-
-_recognizer: Optional[CaptchaRecognizer] = None
-
-
-def get_recognizer() -> CaptchaRecognizer:
+from .context_pool import ContextPool, PreparedContext
+from .latency import LatencyStats
+from .session_store import SessionStore
+from .trade_calendar import check_today, exchange_today
+from .tracing import tracer
+from .waits import wait_for_checked_rows, wait_for_dialog_or_confirm, wait_for_table_state
+
+LOGIN_PATH = "/Login?el=1&clear=&returl=%2fTrade%2fBuy"
+BATCH_PURCHASE_PATH = "/Trade/XzsgBatPurchase"
+# 具名等待的默认超时（毫秒）；有了历史样本后改用 LatencyStats 按账号给出的值
+WAIT_DEFAULTS_MS = {
+    "non_trade_popup": 1500,
+    "login_notice": 1500,
+    "captcha_response": 5000,
+    "bond_list": 5000,
+    "table_rows": 9000,
+    "dialog_or_confirm": 5200,
+}
+# 决定申购结果的等待：超时按失败处理并重试，超时只允许按历史耗时放宽，不低于默认值
+OUTCOME_WAITS = {"table_rows", "dialog_or_confirm"}
+# 超时后目标仍可能出现并挡住后续操作的等待：登录公告晚于等待弹出会遮住菜单，
+# 这类超时无法可靠地记为删失样本，同样不低于默认值
+BLOCKING_WAITS = {"login_notice"}
+# “暂无数据”需稳定这么久才判定为无可申购，表格等待不能短于它。
+# 不短于原先轮询表格的 6 秒期限，数据晚到的行不会被误判为无可申购。
+TABLE_SETTLE_MS = 6000
+# 预热页面的登录页导航尚未提交时最多再等这么久，之后改用 page.goto
+PREWARM_COMMIT_TIMEOUT_MS = 3000
+# #imgValidCode 的图片地址，形如 /Login/YZM?randNum=0.123
+CAPTCHA_URL_PATTERN = re.compile(r"/Login/YZM", re.IGNORECASE)
+
+_recognizer: Optional[Union[CaptchaRecognizer, InferenceWorker]] = None
+_recognizer_lock = threading.Lock()
+
+
+def get_recognizer(batch_window_ms: int = 0) -> Union[CaptchaRecognizer, InferenceWorker]:
     global _recognizer
     if _recognizer is None:
-        _recognizer = CaptchaRecognizer()
+        with _recognizer_lock:
+            if _recognizer is None:
+                recognizer = CaptchaRecognizer(span=tracer.span)
+                if batch_window_ms > 0:
+                    # 并发账号同时识别验证码时合并成一次推理
+                    _recognizer = InferenceWorker(recognizer, window_ms=batch_window_ms)
+                else:
+                    _recognizer = recognizer
     return _recognizer
 
 
+def start_recognizer_warmup(batch_window_ms: int = 0) -> threading.Thread:
+    def warmup() -> None:
+        try:
+            with tracer.span("warmup") as span:
+                get_recognizer(batch_window_ms).warmup()
+            print(f"验证码模型预热完成，耗时 {span.duration:.2f}s")
+        except Exception as exc:
+            print(f"验证码模型预热失败: {exc}")
+
+    # 与浏览器启动、登录页加载并行，首次识别验证码时模型已就绪
+    thread = threading.Thread(target=warmup, name="captcha-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
 def launch_browser(playwright: Playwright, browser_name: str, headless: bool) -> Browser:
     launch_args = ["--disable-dev-shm-usage"]
     if headless:
@@ -37,201 +103,539 @@ def launch_browser(playwright: Playwright, browser_name: str, headless: bool) ->
 
 
 class EastmoneyPurchaser:
-    def __init__(self, browser: Browser, config: AppConfig):
+    def __init__(
+        self,
+        browser: Browser,
+        config: AppConfig,
+        latency: Optional[LatencyStats] = None,
+        deadline: Optional[float] = None,
+        artifacts: Optional[ArtifactWriter] = None,
+    ):
+        """
+        Args:
+            browser: 已启动的浏览器
+            config: 运行配置
+            latency: 历史耗时统计，提供后各具名等待按历史耗时设置超时
+            deadline: 本轮运行的截止时间（time.monotonic），临近时缩短等待并停止重试
+            artifacts: 失败现场的后台写入器，不传则自行创建
+        """
         self.browser = browser
         self.config = config
+        self.latency = latency
+        self.deadline = deadline
+        self._account = ""
+        self._attempt = 0
+        # 当前账号之后本线程是否还有账号要跑，没有时最后一次尝试不再预热上下文
+        self._more_users = True
+        self._trace: Optional[TraceRecorder] = None
+        self.artifacts = artifacts or create_artifact_writer(config)
+        self.login_url = config.base_url + LOGIN_PATH
+        self.session_store: Optional[SessionStore] = None
+        if config.session_dir:
+            self.session_store = SessionStore(config.session_dir, config.session_key, config.session_max_age_hours)
+        self.availability: Optional[AvailabilityCache] = None
+        if config.availability_dir:
+            self.availability = AvailabilityCache(config.availability_dir)
+        self.context_pool: Optional[ContextPool] = None
+        if config.context_prewarm:
+            self.context_pool = ContextPool(lambda: self._prepare_context(navigate=True))
+        self.captcha_dataset: Optional[CaptchaDataset] = None
+        if config.captcha_dataset_dir:
+            self.captcha_dataset = CaptchaDataset(config.captcha_dataset_dir)
+
+    def close(self) -> None:
+        """关闭预热中的上下文；浏览器由调用方关闭"""
+        if self.context_pool is not None:
+            self.context_pool.close()
+
+    def run_for_user(self, user: UserCredential, more_users: bool = True) -> str:
+        """
+        Args:
+            more_users: 之后是否还有账号由本实例处理，用于决定是否为下一个账号预热上下文
+        """
+        self._account = user.account
+        self._more_users = more_users
+        with tracer.context(account=user.account), tracer.span("account") as span:
+            if self._known_no_bonds():
+                # 同一轮里前面的账号刚确认过今天无债
+                result = "当前没有可申购的债券（今日已确认）"
+            else:
+                result = self._run_with_retries(user)
+            span.attributes["result"] = result
+            return result
 
-    def run_for_user(self, user: UserCredential) -> str:
+    def _run_with_retries(self, user: UserCredential) -> str:
         last_error: Optional[Exception] = None
 
         for attempt in range(1, self.config.flow_retries + 1):
-            context = self.browser.new_context(viewport={"width": 1920, "height": 1080})
-            page = context.new_page()
-            try:
-                print(f"[{user.account}] 开始执行，第 {attempt}/{self.config.flow_retries} 次")
-                return self._run_once(page, user)
-            except Exception as exc:
-                last_error = exc
-                self._save_error_screenshot(page, user.account, attempt)
-                print(f"[{user.account}] 第 {attempt} 次失败: {exc}")
-            finally:
-                context.close()
+            if not self._has_time_for_attempt(attempt):
+                if last_error is None:
+                    raise RuntimeError("已超过本轮运行截止时间，未执行")
+                print(f"[{user.account}] 剩余时间不足以再试一次，停止重试")
+                break
+            self._attempt = attempt
+            with tracer.context(attempt=attempt):
+                try:
+                    return self._run_attempt(user, attempt)
+                except Exception as exc:
+                    last_error = exc
+                    print(f"[{user.account}] 第 {attempt} 次失败: {exc}")
 
         if last_error is None:
             raise RuntimeError("未知错误")
         raise RuntimeError(str(last_error))
 
-    def _run_once(self, page: Page, user: UserCredential) -> str:
-        self._goto_login_with_retry(page)
+    def _run_attempt(self, user: UserCredential, attempt: int) -> str:
+        with tracer.span("new_context") as span:
+            storage_state = self.session_store.load(user.account) if self.session_store else None
+            if storage_state is None and self.context_pool is not None:
+                prepared = self.context_pool.acquire()
+            else:
+                # 已保存的登录状态只能在新建上下文时载入，不用预热的上下文
+                prepared = self._prepare_context(storage_state=storage_state)
+            span.attributes["prewarmed"] = prepared.navigated
+            context, page, blocker = prepared.context, prepared.page, prepared.blocker
+            self._trace = self._start_trace(context)
+
+        try:
+            print(f"[{user.account}] 开始执行，第 {attempt}/{self.config.flow_retries} 次")
+            started = time.perf_counter()
+            with tracer.span("attempt") as span:
+                result = self._run_once(page, user, prepared, resume_session=storage_state is not None)
+                span.attributes["result"] = result
+            self._record("attempt", started)
+            return result
+        except Exception:
+            with tracer.span("error_screenshot"):
+                self._capture_failure(page, user.account, attempt)
+            raise
+        finally:
+            self._trace = None
+            context.close()
+            if blocker is not None:
+                print(f"[{user.account}] 资源拦截: {blocker.summary()}")
+
+    def _prepare_context(self, storage_state: Optional[dict] = None, navigate: bool = False) -> PreparedContext:
+        """
+        新建上下文与页面，并在打开任何页面之前挂好资源拦截与验证码响应监听
+
+        Args:
+            storage_state: 已保存的登录状态
+            navigate: 是否立即发起登录页导航（不等待加载完成）
+        """
+        context = self.browser.new_context(viewport={"width": 1920, "height": 1080}, storage_state=storage_state)
+        try:
+            blocker = self._create_blocker()
+            if blocker is not None:
+                blocker.attach(context)
+            page = context.new_page()
+            captcha_responses = CaptchaResponseListener(page) if self.config.captcha_capture == "response" else None
+            if navigate:
+                # page.goto 会等到页面加载完成；直接改 location.href 立即返回，加载在浏览器里进行
+                page.evaluate("url => { window.location.href = url; }", self.login_url)
+        except Exception:
+            context.close()
+            raise
+        return PreparedContext(context, page, blocker, captcha_responses, navigated=navigate)
+
+    def _prefill_context(self) -> None:
+        """当前账号已过登录页，为下一次尝试预热上下文，与当前账号后续步骤并行加载"""
+        if self.context_pool is None:
+            return
+        if not self._more_users and self._attempt >= self.config.flow_retries:
+            # 最后一个账号的最后一次尝试，预热的上下文不会再被用到，只会与当前账号争抢带宽
+            return
+        self.context_pool.prefill()
+
+    def _start_trace(self, context) -> Optional[TraceRecorder]:
+        if not self.config.artifact_trace:
+            return None
+        try:
+            return TraceRecorder(context, self.config.artifact_trace_seconds)
+        except Exception as exc:
+            print(f"trace 启动失败: {exc}")
+            return None
+
+    def _rotate_trace(self) -> None:
+        if self._trace is not None:
+            self._trace.rotate_if_stale()
+
+    def _timeout(self, phase: str) -> int:
+        """具名等待的超时：有历史样本时按历史耗时，临近截止时间时进一步缩短"""
+        timeout = WAIT_DEFAULTS_MS[phase]
+        if self.latency is not None:
+            timeout = self.latency.timeout_ms(self._account, phase, timeout)
+            if phase in OUTCOME_WAITS or phase in BLOCKING_WAITS:
+                timeout = max(timeout, WAIT_DEFAULTS_MS[phase])
+        remaining = self._remaining_ms()
+        if remaining is not None:
+            # Playwright 的 timeout=0 表示不限时，这里至少保留下限
+            timeout = max(min(timeout, remaining), self.config.timeout_floor_ms)
+        return timeout
+
+    def _record(self, phase: str, started: float, timed_out: bool = False) -> None:
+        """
+        记录一次等待的耗时
+
+        Args:
+            timed_out: 未等到目标，记为删失样本，下次超时随之放宽。
+                只用于目标理应出现的等待；非交易日弹窗、登录公告本就常常不出现，超时不记录。
+        """
+        if self.latency is not None:
+            self.latency.record(self._account, phase, (time.perf_counter() - started) * 1000, timed_out=timed_out)
+
+    def _remaining_ms(self) -> Optional[int]:
+        if self.deadline is None:
+            return None
+        return int((self.deadline - time.monotonic()) * 1000)
+
+    def _has_time_for_attempt(self, attempt: int) -> bool:
+        """剩余时间不够一次完整尝试（按该账号历史中位耗时估计）时不再重试"""
+        remaining = self._remaining_ms()
+        if remaining is None:
+            return True
+        if remaining <= 0:
+            return False
+        if attempt == 1 or self.latency is None:
+            return True
+        estimate = self.latency.estimate_ms(self._account, "attempt")
+        return estimate is None or remaining >= estimate
+
+    def _create_blocker(self) -> Optional[ResourceBlocker]:
+        if not self.config.block_resources:
+            return None
+        return ResourceBlocker(
+            self.config.blocked_resource_types,
+            self.config.blocked_url_patterns,
+            allow_patterns=(CAPTCHA_URL_PATTERN,),
+        )
+
+    def _run_once(
+        self, page: Page, user: UserCredential, prepared: PreparedContext, resume_session: bool = False
+    ) -> str:
+        # 在打开申购页之前开始监听，列表接口一返回就能判断有没有可申购的债券
+        bond_list = BondListListener(page)
 
-        if self._is_non_trade_day(page):
-            return "目前不能打新债"
+        if resume_session and self._resume_session(page, user, bond_list):
+            print(f"[{user.account}] 已保存的登录状态有效，跳过登录")
+            self._prefill_context()
+        else:
+            self._goto_login_with_retry(page, navigated=prepared.navigated)
 
-        page.locator("#txtZjzh").fill(user.account, timeout=self.config.timeout_ms)
-        page.locator("#txtPwd").fill(user.password, timeout=self.config.timeout_ms)
+            if self._is_non_trade_day(page):
+                self._check_calendar(site_open=False)
+                return "目前不能打新债"
+            self._check_calendar(site_open=True)
 
-        captcha_code = self._recognize_captcha_with_retry(page)
-        page.locator("#txtValidCode").fill(captcha_code, timeout=self.config.timeout_ms)
-        page.locator("#btnConfirm").click(timeout=self.config.timeout_ms)
+            page.locator("#txtZjzh").fill(user.account, timeout=self.config.timeout_ms)
+            page.locator("#txtPwd").fill(user.password, timeout=self.config.timeout_ms)
 
-        self._safe_click(page.locator(".vbtn-confirm"), timeout_ms=1500)
+            self._rotate_trace()
+            captcha_code, captcha_image = self._recognize_captcha_with_retry(page, prepared.captcha_responses)
+            with tracer.span("login_submit"):
+                page.locator("#txtValidCode").fill(captcha_code, timeout=self.config.timeout_ms)
+                page.locator("#btnConfirm").click(timeout=self.config.timeout_ms)
 
-        self._open_new_stock_bond_menu(page)
-        self._open_bond_batch_purchase_page(page)
+                started = time.perf_counter()
+                if self._safe_click(page.locator(".vbtn-confirm"), timeout_ms=self._timeout("login_notice")):
+                    self._record("login_notice", started)
 
+            self._prefill_context()
+
+            self._rotate_trace()
+            try:
+                self._open_new_stock_bond_menu(page)
+            except Exception:
+                self._save_captcha_sample(captcha_image, captcha_code, accepted=False)
+                raise
+            self._save_captcha_sample(captcha_image, captcha_code, accepted=True)
+            # 菜单能打开说明已登录成功
+            self._save_session(page, user)
+            self._open_bond_batch_purchase_page(page)
+
+        self._rotate_trace()
+        bonds = self._read_bond_list(bond_list)
+        if bonds == []:
+            return "当前没有可申购的债券"
+
+        # 表格始终未加载完成时 _has_purchasable_rows 抛出异常，失败重试并留存现场
         if not self._has_purchasable_rows(page):
+            if bonds:
+                # 接口列出的债券不一定今天都能申购（未到申购日、本账号已申购等），STATUS 的取值又没有文档，
+                # 以表格稳定下来的结果为准；这只说明本账号不可申购，不写入可申购缓存
+                print(f"申购列表接口返回 {len(bonds)} 只债券，但表格中没有可勾选的行，按无可申购处理")
+                return f"当前没有可申购的债券，申购列表: {'；'.join(bond.describe() for bond in bonds)}"
             return "当前没有可申购的债券"
 
         if not self._select_all(page):
             # 这里不要降级成“无可申购”，否则会把页面结构变化误报成无债。
             raise RuntimeError("检测到可申购列表但全选失败，可能页面结构变化")
 
+        with tracer.span("batch_buy"):
+            result = self._submit_batch_purchase(page)
+        if bonds:
+            result = f"{result}，申购列表: {'；'.join(bond.describe() for bond in bonds)}"
+        return result
+
+    def _read_bond_list(self, bond_list: BondListListener) -> Optional[list[Bond]]:
+        with tracer.span("bond_list") as span:
+            started = time.perf_counter()
+            bonds = bond_list.wait(timeout_ms=self._timeout("bond_list"))
+            if bonds is not None:
+                self._record("bond_list", started)
+            elif bond_list.latest is None:
+                # 接口响应没等到（而不是解析失败）
+                self._record("bond_list", started, timed_out=True)
+            span.attributes["bonds"] = -1 if bonds is None else len(bonds)
+        if bonds is not None:
+            self._save_availability(bonds)
+            print(f"可申购列表 {len(bonds)} 只: {'；'.join(bond.describe() for bond in bonds) or '无'}")
+        return bonds
+
+    def _submit_batch_purchase(self, page: Page) -> str:
         self._click_batch_buy(page)
 
-        dialog_message = self._wait_dialog_message(page, timeout_ms=2200)
-        if dialog_message:
-            normalized = normalize_text(dialog_message)
-            if "请选择需申购的新债" in normalized:
-                # 页面偶发“点了全选但实际没勾上”，这里做一次自动重试。
-                self._safe_click(page.locator("#btnCxcConfirm"), timeout_ms=2000)
-                if self._retry_select_and_batch_buy(page):
-                    dialog_message = self._wait_dialog_message(page, timeout_ms=1800)
-                    if dialog_message:
-                        normalized = normalize_text(dialog_message)
-                        self._safe_click(page.locator("#btnCxcConfirm"), timeout_ms=2000)
-                        if "请选择需申购的新债" in normalized:
-                            raise RuntimeError("检测到可申购列表但未成功勾选，可能页面结构变化")
-                        if is_no_purchase_message(normalized):
-                            return "当前没有可申购的债券"
-                        return clean_dialog_text(normalized)
-                else:
-                    raise RuntimeError("检测到可申购列表但未成功勾选，可能页面结构变化")
-            else:
-                self._safe_click(page.locator("#btnCxcConfirm"), timeout_ms=2000)
+        # 提示弹窗和申购确认哪个先出现就处理哪个，不再先干等弹窗超时
+        outcome = self._wait_for_dialog_or_confirm(page)
+        if outcome == "dialog":
+            normalized = normalize_text(self._read_dialog_message(page))
+            self._safe_click(page.locator("#btnCxcConfirm"), timeout_ms=2000)
+            if "请选择需申购的新债" not in normalized:
                 if is_no_purchase_message(normalized):
                     return "当前没有可申购的债券"
                 return clean_dialog_text(normalized)
 
-        confirm = page.locator("#btnConfirm:visible").first
-        try:
-            confirm.wait_for(state="visible", timeout=3000)
-        except PlaywrightTimeoutError:
-            dialog_message = self._read_dialog_message(page)
-            if dialog_message:
-                normalized = normalize_text(dialog_message)
-                if "请选择需申购的新债" in normalized:
-                    self._safe_click(page.locator("#btnCxcConfirm"), timeout_ms=2000)
-                    if self._retry_select_and_batch_buy(page):
-                        confirm.wait_for(state="visible", timeout=3000)
-                        confirm.click(timeout=self.config.timeout_ms)
-                        dialog_text = page.locator("#Cxc_Dialog").inner_text(timeout=self.config.timeout_ms)
-                        return clean_dialog_text(dialog_text)
-                    raise RuntimeError("检测到可申购列表但未成功勾选，可能页面结构变化")
+            # 页面偶发“点了全选但实际没勾上”，这里做一次自动重试。
+            if not self._retry_select_and_batch_buy(page):
+                raise RuntimeError("检测到可申购列表但未成功勾选，可能页面结构变化")
 
+            outcome = self._wait_for_dialog_or_confirm(page)
+            if outcome == "dialog":
+                normalized = normalize_text(self._read_dialog_message(page))
                 self._safe_click(page.locator("#btnCxcConfirm"), timeout_ms=2000)
+                if "请选择需申购的新债" in normalized:
+                    raise RuntimeError("检测到可申购列表但未成功勾选，可能页面结构变化")
                 if is_no_purchase_message(normalized):
                     return "当前没有可申购的债券"
                 return clean_dialog_text(normalized)
-            return "当前没有可申购的债券"
 
-        confirm.click(timeout=self.config.timeout_ms)
+        if outcome != "confirm":
+            # 已确认有可勾选的行并点了批量申购，既无弹窗也无确认按钮是页面异常，不能当成无债
+            raise RuntimeError("点击批量申购后未出现确认按钮或提示弹窗")
+
+        page.locator("#btnConfirm:visible").first.click(timeout=self.config.timeout_ms)
         dialog_text = page.locator("#Cxc_Dialog").inner_text(timeout=self.config.timeout_ms)
         return clean_dialog_text(dialog_text)
 
-    def _goto_login_with_retry(self, page: Page) -> None:
-        last_error: Optional[Exception] = None
-        for attempt in range(1, 4):
+    def _wait_for_dialog_or_confirm(self, page: Page) -> str:
+        started = time.perf_counter()
+        outcome = wait_for_dialog_or_confirm(page, timeout_ms=self._timeout("dialog_or_confirm"))
+        self._record("dialog_or_confirm", started, timed_out=not outcome)
+        return outcome
+
+    def _resume_session(self, page: Page, user: UserCredential, bond_list: BondListListener) -> bool:
+        with tracer.span("resume_session"):
             try:
-                page.goto(LOGIN_URL, wait_until="domcontentloaded", timeout=self.config.timeout_ms)
-                return
+                page.goto(
+                    self.config.base_url + BATCH_PURCHASE_PATH,
+                    wait_until="domcontentloaded",
+                    timeout=self.config.timeout_ms,
+                )
             except Exception as exc:
-                last_error = exc
-                if attempt < 3:
-                    page.wait_for_timeout(1000 * attempt)
+                print(f"[{user.account}] 使用已保存的登录状态打开申购页失败: {exc}")
+                return False
 
-        if last_error is None:
-            raise RuntimeError("登录页加载失败")
-        raise last_error
+            # 会话失效时通常会被重定向回登录页；停在申购页时再以列表接口正常返回确认确实已登录，
+            # 避免前端跳转或接口报错的失效会话被当成有效，最后误报为“无可申购”
+            if "/trade/xzsgbatpurchase" in page.url.lower() and bond_list.confirms_login(self._timeout("bond_list")):
+                return True
 
-    def _is_non_trade_day(self, page: Page) -> bool:
+            print(f"[{user.account}] 已保存的登录状态已失效，重新登录")
+            self.session_store.delete(user.account)
+            return False
+
+    def _save_session(self, page: Page, user: UserCredential) -> None:
+        if self.session_store is None:
+            return
         try:
-            page.locator("button.btn-orange.vbtn-confirm").first.wait_for(state="visible", timeout=1500)
+            self.session_store.save(user.account, page.context.storage_state())
+        except Exception as exc:
+            print(f"[{user.account}] 保存登录状态失败: {exc}")
+
+    def _goto_login_with_retry(self, page: Page, navigated: bool = False) -> None:
+        """
+        Args:
+            navigated: 页面已由 ContextPool 发起登录页导航，只需等它加载完成
+        """
+        with tracer.span("login_page"):
+            if navigated and self._prewarmed_login_ready(page):
+                return
+
+            last_error: Optional[Exception] = None
+            for attempt in range(1, 4):
+                try:
+                    page.goto(self.login_url, wait_until="domcontentloaded", timeout=self.config.timeout_ms)
+                    return
+                except Exception as exc:
+                    last_error = exc
+                    if attempt < 3:
+                        page.wait_for_timeout(1000 * attempt)
+
+            if last_error is None:
+                raise RuntimeError("登录页加载失败")
+            raise last_error
+
+    def _prewarmed_login_ready(self, page: Page) -> bool:
+        """
+        等预热页面上的登录页加载完成。导航失败（停在 chrome-error://）或被重定向到别处时立即返回 False，
+        不等满 TIMEOUT_MS，由调用方按原来的方式 goto 重试
+        """
+        try:
+            if page.url == "about:blank":
+                # location.href 发起的导航还没有提交
+                page.wait_for_url(
+                    lambda url: url != "about:blank", wait_until="commit", timeout=PREWARM_COMMIT_TIMEOUT_MS
+                )
+            if LOGIN_PATH.lower() not in page.url.lower():
+                print(f"预先打开的登录页不可用，重新打开: {page.url}")
+                return False
+            page.wait_for_load_state("domcontentloaded", timeout=self.config.timeout_ms)
             return True
-        except PlaywrightTimeoutError:
+        except Exception as exc:
+            print(f"预先打开的登录页不可用，重新打开: {exc}")
             return False
 
-    def _recognize_captcha_with_retry(self, page: Page) -> str:
-        recognizer = get_recognizer()
-        captcha = page.locator("#imgValidCode")
-
-        for attempt in range(1, self.config.captcha_retries + 1):
+    def _is_non_trade_day(self, page: Page) -> bool:
+        with tracer.span("non_trade_check"):
+            started = time.perf_counter()
             try:
-                image_bytes = captcha.screenshot(type="png", timeout=self.config.timeout_ms)
-                code = recognizer.recognize_from_bytes(image_bytes)
-                print(f"验证码识别结果 (第{attempt}次): {code}")
-                if re.fullmatch(r"\d{4}", code):
-                    return code
-                raise ValueError(f"识别结果格式异常: {code}")
-            except Exception as exc:
-                print(f"验证码识别失败 (第{attempt}次): {exc}")
-                if attempt >= self.config.captcha_retries:
+                page.locator("button.btn-orange.vbtn-confirm").first.wait_for(
+                    state="visible", timeout=self._timeout("non_trade_popup")
+                )
+                self._record("non_trade_popup", started)
+                return True
+            except PlaywrightTimeoutError:
+                return False
+
+    def _check_calendar(self, site_open: bool) -> None:
+        """
+        站点与交易日历结论不一致时记录日志，提示更新日历
+
+        与 TRADE_CALENDAR 是否跳过休市日无关：跳过关闭时（如手动触发）仍然比对，
+        日历把交易日误标为休市的情况只有在这种运行里才能被发现。
+        """
+        if not self.config.trade_calendar_verify:
+            return
+        trading = check_today(self.config.trade_calendar_file)
+        if trading is None or trading == site_open:
+            return
+        if site_open:
+            print(
+                "交易日历与站点不一致: 日历显示今天休市，但站点可以登录。"
+                "启用 TRADE_CALENDAR 的定时运行会跳过今天，请尽快修正 TRADE_CALENDAR_FILE"
+            )
+        else:
+            print("交易日历与站点不一致: 日历显示今天交易日，站点提示不能打新债，请核对 TRADE_CALENDAR_FILE")
+
+    def _recognize_captcha_with_retry(
+        self, page: Page, captcha_responses: Optional["CaptchaResponseListener"] = None
+    ) -> tuple[str, bytes]:
+        """
+        Returns:
+            (验证码, 识别所用的图片)
+        """
+        with tracer.span("captcha") as span:
+            recognizer = get_recognizer(self.config.captcha_batch_window_ms)
+            captcha = page.locator("#imgValidCode")
+
+            for attempt in range(1, self.config.captcha_retries + 1):
+                if attempt > 1 and self._remaining_ms() is not None and self._remaining_ms() <= 0:
+                    print("已超过本轮运行截止时间，停止刷新验证码")
                     break
-                captcha.click(timeout=self.config.timeout_ms)
-                page.wait_for_timeout(500)
-
-        raise RuntimeError(f"验证码识别失败，已重试 {self.config.captcha_retries} 次")
+                span.attributes["captcha_attempts"] = attempt
+                try:
+                    image_bytes = self._capture_captcha(page, captcha, captcha_responses, refresh=attempt > 1)
+                    result = recognizer.recognize_detailed_from_bytes(image_bytes)
+                    code = result.code
+                    print(f"验证码识别结果 (第{attempt}次): {code}, 置信度: {result.confidence:.2f}")
+                    if not re.fullmatch(r"\d{4}", code):
+                        raise ValueError(f"识别结果格式异常: {code}")
+                    # 置信度过低时直接刷新，省掉一次注定失败的登录；最后一次仍然提交。
+                    if result.confidence < self.config.captcha_min_confidence and attempt < self.config.captcha_retries:
+                        raise ValueError(
+                            f"置信度过低: {result.confidence:.2f} < {self.config.captcha_min_confidence:.2f}，"
+                            f"候选: {[candidate for candidate, _ in result.alternatives]}"
+                        )
+                    return code, image_bytes
+                except Exception as exc:
+                    print(f"验证码识别失败 (第{attempt}次): {exc}")
+
+            raise RuntimeError(f"验证码识别失败，已重试 {self.config.captcha_retries} 次")
+
+    def _capture_captcha(
+        self,
+        page: Page,
+        captcha: Locator,
+        captcha_responses: Optional["CaptchaResponseListener"],
+        refresh: bool,
+    ) -> bytes:
+        if captcha_responses is not None:
+            started = time.perf_counter()
+            image_bytes = captcha_responses.capture(captcha, refresh=refresh, timeout_ms=self._timeout("captcha_response"))
+            if image_bytes:
+                self._record("captcha_response", started)
+                return image_bytes
+            self._record("captcha_response", started, timed_out=True)
+            # 图片地址不符合预期时退回截图，此时图片已经刷新过，不能再点一次
+            print("未捕获到验证码图片响应，改用截图")
+        elif refresh:
+            captcha.click(timeout=self.config.timeout_ms)
+            page.wait_for_timeout(500)
+
+        return captcha.screenshot(type="png", timeout=self.config.timeout_ms)
+
+    def _save_captcha_sample(self, image_bytes: bytes, code: str, accepted: bool) -> None:
+        """登录通过说明验证码答案正确，样本供 python -m captcha.finetune 微调模型"""
+        if self.captcha_dataset is None:
+            return
+        try:
+            self.captcha_dataset.append(image_bytes, code, accepted)
+        except Exception as exc:
+            print(f"验证码样本保存失败: {exc}")
 
     def _open_new_stock_bond_menu(self, page: Page) -> None:
-        menu = page.locator("li.top_item[href='/Trade/NewBuy'] > a.top_a").first
-        menu.click(timeout=self.config.timeout_ms)
-        page.locator("li.top_item[href='/Trade/NewBuy'] ul.sub").first.wait_for(
-            state="visible", timeout=self.config.timeout_ms
-        )
+        with tracer.span("menu"):
+            menu = page.locator("li.top_item[href='/Trade/NewBuy'] > a.top_a").first
+            menu.click(timeout=self.config.timeout_ms)
+            page.locator("li.top_item[href='/Trade/NewBuy'] ul.sub").first.wait_for(
+                state="visible", timeout=self.config.timeout_ms
+            )
 
     def _open_bond_batch_purchase_page(self, page: Page) -> None:
-        link = page.locator(
-            "li.top_item[href='/Trade/NewBuy'] li.sub_item[data-value='trade/xzsgbatpurchase'] > a"
-        ).first
-        link.click(timeout=self.config.timeout_ms)
-        page.wait_for_url("**/Trade/XzsgBatPurchase", timeout=self.config.timeout_ms)
+        with tracer.span("purchase_page"):
+            link = page.locator(
+                "li.top_item[href='/Trade/NewBuy'] li.sub_item[data-value='trade/xzsgbatpurchase'] > a"
+            ).first
+            link.click(timeout=self.config.timeout_ms)
+            page.wait_for_url("**/Trade/XzsgBatPurchase", timeout=self.config.timeout_ms)
 
     def _click_batch_buy(self, page: Page) -> None:
         page.locator("#btnBatBuy:visible").first.click(timeout=self.config.timeout_ms)
 
     def _select_all(self, page: Page) -> bool:
-        checkboxes = page.locator("#tableBody input[name='chkitem']")
-        if checkboxes.count() == 0:
-            return False
+        with tracer.span("select"):
+            # 全选、逐行补勾与结果校验在页面内一次完成，无头环境里 #chk_all 偶发失效也能兜住。
+            rows = check_all_rows(page)
+            if not rows:
+                return False
 
-        try:
-            select_all = page.locator("#chk_all")
-            select_all.scroll_into_view_if_needed(timeout=self.config.timeout_ms)
-            select_all.click(timeout=self.config.timeout_ms)
-        except Exception:
-            pass
-
-        page.wait_for_timeout(300)
-        if self._has_checked_rows(page):
-            return True
-
-        # 无头环境里 #chk_all 偶发失效，回退到逐行勾选，避免误报“未勾选”。
-        for i in range(checkboxes.count()):
-            checkbox = checkboxes.nth(i)
-            try:
-                if checkbox.is_enabled() and not checkbox.is_checked():
-                    checkbox.scroll_into_view_if_needed(timeout=self.config.timeout_ms)
-                    checkbox.click(timeout=self.config.timeout_ms)
-            except Exception:
-                continue
-
-        page.wait_for_timeout(300)
-        return self._has_checked_rows(page)
+            checked = [row for row in rows if row.checked]
+            if checked:
+                print(f"已勾选 {len(checked)}/{len(rows)} 只: {', '.join(f'{row.code} {row.name}'.strip() for row in checked)}")
+                return True
 
-    def _has_checked_rows(self, page: Page) -> bool:
-        try:
-            return page.locator("#tableBody input[name='chkitem']:checked").count() > 0
-        except Exception:
-            return False
+            # 勾选状态可能由页面异步更新，稍等后再确认一次
+            return wait_for_checked_rows(page, timeout_ms=300)
 
     def _retry_select_and_batch_buy(self, page: Page) -> bool:
         if not self._select_all(page):
@@ -246,44 +650,39 @@ class EastmoneyPurchaser:
         except Exception:
             return ""
 
-    def _has_purchasable_rows(self, page: Page) -> bool:
-        table_body = page.locator("#tableBody")
-        try:
-            table_body.wait_for(state="attached", timeout=3000)
-        except PlaywrightTimeoutError:
+    def _known_no_bonds(self) -> bool:
+        if self.availability is None or self.config.force_bond_check:
             return False
+        return self.availability.known_empty(exchange_today())
 
-        deadline = datetime.now().timestamp() + 6
-        while datetime.now().timestamp() < deadline:
-            rows = table_body.locator("tr")
-            if rows.count() == 0:
-                page.wait_for_timeout(300)
-                continue
-
-            first_text = normalize_text(rows.first.inner_text())
-            if "暂无数据" in first_text:
-                page.wait_for_timeout(500)
-                continue
-
-            checkbox_count = table_body.locator("input[name='chkitem']").count()
-            if checkbox_count == 0:
-                # 有些时段会出现“表格框架已渲染，但可选项未挂载”的短暂状态。
-                # 不能直接判定为有可申购，否则后续会触发全选失败误报。
-                page.wait_for_timeout(500)
-                continue
+    def _save_availability(self, bonds: list[Bond]) -> None:
+        if self.availability is None:
+            return
+        try:
+            self.availability.save(exchange_today(), bonds)
+        except Exception as exc:
+            print(f"保存可申购列表失败: {exc}")
+            return
+        if not bonds:
+            print("申购列表接口返回空列表，已记录今日无可申购债券，今天后续账号与运行将跳过登录")
 
+    def _has_purchasable_rows(self, page: Page) -> bool:
+        with tracer.span("table_wait"):
+            # 接口数据已确认有债时这里只等表格挂载勾选框；拿不到接口数据时才靠表格判断。
+            # 有些时段会出现“表格框架已渲染，但可选项未挂载”或短暂“暂无数据”的状态，
+            # 只有无数据状态稳定一段时间才判定为无可申购。
+            started = time.perf_counter()
+            timeout_ms = max(self._timeout("table_rows"), TABLE_SETTLE_MS + 1000)
+            state = wait_for_table_state(page, timeout_ms=timeout_ms, settle_ms=TABLE_SETTLE_MS)
+            if state == "empty":
+                return False
+            if state != "rows":
+                # 超时时表格既没有可勾选的行也没有稳定的“暂无数据”，按失败重试而不是判定无债
+                self._record("table_rows", started, timed_out=True)
+                raise RuntimeError(f"申购列表 {timeout_ms}ms 内未加载完成")
+            self._record("table_rows", started)
             return True
 
-        return False
-
-    def _wait_dialog_message(self, page: Page, timeout_ms: int) -> str:
-        dialog = page.locator("#Cxc_Dialog:visible").first
-        try:
-            dialog.wait_for(state="visible", timeout=timeout_ms)
-            return dialog.inner_text(timeout=1200)
-        except Exception:
-            return ""
-
     def _safe_click(self, locator: Locator, timeout_ms: int) -> bool:
         try:
             locator.first.click(timeout=timeout_ms)
@@ -291,19 +690,64 @@ class EastmoneyPurchaser:
         except Exception:
             return False
 
-    def _save_error_screenshot(self, page: Page, account: str, attempt: int) -> None:
-        screenshot_dir = Path(self.config.screenshot_dir)
-        screenshot_dir.mkdir(parents=True, exist_ok=True)
-
+    def _capture_failure(self, page: Page, account: str, attempt: int) -> None:
+        """
+        失败现场：视口截图与 DOM 快照取回内存后交给后台写入，可选保存最近一段 trace。
+        不再截整页 PNG，重试可以马上开始。
+        """
         suffix = re.sub(r"[^0-9A-Za-z_-]", "_", account[-4:] if len(account) >= 4 else account)
-        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-        screenshot_path = screenshot_dir / f"{timestamp}-{suffix}-attempt{attempt}.png"
+        prefix = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{suffix}-attempt{attempt}"
 
         try:
-            page.screenshot(path=str(screenshot_path), full_page=True)
-            print(f"异常截图已保存: {screenshot_path}")
+            self.artifacts.submit(f"{prefix}.jpg", page.screenshot(type="jpeg", quality=70, timeout=2000))
         except Exception:
             pass
+        try:
+            self.artifacts.submit(f"{prefix}.html", page.content().encode("utf-8"), compress=True)
+        except Exception:
+            pass
+        if self._trace is not None:
+            path = self.artifacts.staging_path(f"{prefix}.trace.zip")
+            if self._trace.save(path):
+                self.artifacts.submit_file(f"{prefix}.trace.zip", path)
+            else:
+                Path(path).unlink(missing_ok=True)
+
+
+class CaptchaResponseListener:
+    """监听 #imgValidCode 的图片响应，直接拿原始字节，省掉截图的渲染、编码与解码"""
+
+    def __init__(self, page: Page):
+        self.page = page
+        self.latest: Optional[Response] = None
+        page.on("response", self._on_response)
+        page.on("framenavigated", self._on_navigated)
+
+    def _on_response(self, response: Response) -> None:
+        if is_captcha_response(response):
+            self.latest = response
+
+    def _on_navigated(self, frame: Frame) -> None:
+        # 页面重新加载后上一张验证码已作废，等新页面自己的图片响应
+        if frame == self.page.main_frame:
+            self.latest = None
+
+    def capture(self, captcha: Locator, refresh: bool, timeout_ms: int) -> bytes:
+        try:
+            if refresh:
+                # 等新图片的响应本身，而不是固定睡眠
+                with self.page.expect_response(is_captcha_response, timeout=timeout_ms) as response_info:
+                    captcha.click(timeout=timeout_ms)
+                self.latest = response_info.value
+            elif self.latest is None:
+                self.latest = self.page.wait_for_event("response", is_captcha_response, timeout=timeout_ms)
+            return self.latest.body()
+        except Exception:
+            return b""
+
+
+def is_captcha_response(response: Response) -> bool:
+    return response.request.resource_type == "image" and bool(CAPTCHA_URL_PATTERN.search(response.url))
 
 
 def normalize_text(text: str) -> str:
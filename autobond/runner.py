@@ -1,34 +1,264 @@
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+
 from dotenv import load_dotenv
-from playwright.sync_api import sync_playwright
 
-from .config import load_config
-from .notifier import send_pushplus
-from .purchaser import EastmoneyPurchaser, launch_browser
+from .artifacts import ArtifactWriter, create_artifact_writer
+from .availability import AvailabilityCache
+from .config import AppConfig, UserCredential, load_config
+from .history import record_run
+from .latency import LatencyStats
+from .notifier import Notifier
+from .trade_calendar import check_today, exchange_today
+from .tracing import tracer
+
+# Playwright 与验证码模块（numpy、OpenCV、推理后端）在确认需要运行后才导入，休市日不承担这部分开销
+if TYPE_CHECKING:
+    from playwright.sync_api import Browser, Playwright
+
+    from .purchaser import EastmoneyPurchaser
 
 
 def run() -> None:
     load_dotenv()
     config = load_config()
 
+    if is_closed_today(config):
+        return
+
+    prepare_run(config)
+    run_once(config)
+
+
+def is_closed_today(config: AppConfig) -> bool:
+    """交易日历显示今天休市；在导入 Playwright 与验证码模块之前调用"""
+    if config.trade_calendar and check_today(config.trade_calendar_file) is False:
+        print("交易日历显示今天休市，跳过运行；如今天实际开市，可设置 TRADE_CALENDAR=false 运行以核对并修正日历")
+        return True
+    return False
+
+
+def prepare_run(config: AppConfig) -> None:
+    # 今天已确认无债时不会用到验证码模型
+    if config.captcha_warmup and not known_no_bonds(config):
+        from .purchaser import start_recognizer_warmup
+
+        start_recognizer_warmup(config.captcha_batch_window_ms)
+
     print(f"浏览器: {config.browser}, Headless: {config.headless}")
+
+
+def run_once(config: AppConfig, browser: Optional["Browser"] = None, notify: bool = True) -> dict[str, str]:
+    """
+    为所有账号执行一轮申购
+
+    Args:
+        config: 运行配置
+        browser: 已启动的浏览器，串行执行时直接复用（常驻模式），不传则本轮自行启动并关闭
+        notify: 是否推送结果；分片运行时由汇总方统一推送
+
+    Returns:
+        账号 -> 结果消息，顺序与 config.users 一致
+    """
     print(f"用户列表: {[user.account for user in config.users]}")
+    tracer.reset()
+    started_at = time.time()
+    results: dict[str, str] = {}
+    shared = RunContext(
+        _create_latency_stats(config),
+        time.monotonic() + config.run_deadline_seconds if config.run_deadline_seconds else None,
+        create_artifact_writer(config),
+    )
+
+    # 推送在后台线程投递，申购流程只入队，不等推送接口返回
+    notifier = Notifier(
+        config.pushplus_token if notify else "",
+        url=config.pushplus_url,
+        digest=config.notify_digest,
+        retries=config.notify_retries,
+    )
+
+    workers = min(config.max_concurrency, len(config.users))
+    try:
+        if known_no_bonds(config):
+            # 今天已有账号确认没有可申购的债券，不再启动浏览器逐个登录
+            print("今日已确认没有可申购的债券，跳过登录；设置 FORCE_BOND_CHECK=true 可强制检查")
+            for user in config.users:
+                results[user.account] = f"[{user.account}] 当前没有可申购的债券（今日已确认）"
+                notifier.notify(results[user.account], user.account)
+        elif workers > 1:
+            print(f"并发执行，并发数: {workers}")
+            _run_concurrent(config, workers, notifier, results, shared)
+        elif browser is not None:
+            _run_accounts(browser, config.users, config, notifier, results, shared)
+        else:
+            _run_sequential(config, notifier, results, shared)
+    finally:
+        _export_traces(config)
+        _record_history(config, started_at, results)
+        _save_latency(shared.latency)
+        shared.artifacts.close()
+        notifier.close()
+    return {user.account: results[user.account] for user in config.users if user.account in results}
+
+
+def known_no_bonds(config: AppConfig) -> bool:
+    """可申购缓存显示今天没有可申购的债券"""
+    if config.force_bond_check or not config.availability_dir:
+        return False
+    return AvailabilityCache(config.availability_dir).known_empty(exchange_today())
+
+
+@dataclass(frozen=True)
+class RunContext:
+    """一轮运行内各账号共享的状态"""
+
+    # 历史耗时统计，关闭自适应超时时为 None
+    latency: Optional[LatencyStats]
+    # time.monotonic() 截止时间，None 表示不限
+    deadline: Optional[float]
+    # 失败现场的后台写入器，本轮结束时等待写完
+    artifacts: ArtifactWriter
+
+
+def _run_sequential(config: AppConfig, notifier: Notifier, results: dict[str, str], shared: RunContext) -> None:
+    from playwright.sync_api import sync_playwright
 
     with sync_playwright() as playwright:
-        browser = launch_browser(playwright, config.browser, config.headless)
-        purchaser = EastmoneyPurchaser(browser, config)
+        browser = launch_browser_timed(playwright, config)
+        try:
+            _run_accounts(browser, config.users, config, notifier, results, shared)
+        finally:
+            browser.close()
+
+
+def _run_accounts(
+    browser: "Browser",
+    users: list[UserCredential],
+    config: AppConfig,
+    notifier: Notifier,
+    results: dict[str, str],
+    shared: RunContext,
+) -> None:
+    from .purchaser import EastmoneyPurchaser
+
+    purchaser = EastmoneyPurchaser(
+        browser, config, latency=shared.latency, deadline=shared.deadline, artifacts=shared.artifacts
+    )
+    try:
+        for index, user in enumerate(users):
+            results[user.account] = _process_user(purchaser, user, notifier, more_users=index < len(users) - 1)
+    finally:
+        purchaser.close()
+
+
+def _run_concurrent(
+    config: AppConfig,
+    workers: int,
+    notifier: Notifier,
+    results: dict[str, str],
+    shared: RunContext,
+) -> None:
+    pending: "queue.Queue[UserCredential]" = queue.Queue()
+    for user in config.users:
+        pending.put(user)
+
+    # Playwright 同步 API 不能跨线程共用，每个工作线程各自启动浏览器，
+    # 从队列里领取账号，总耗时取决于最慢的那条线而不是所有账号之和。
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="autobond") as executor:
+        futures = [executor.submit(_run_worker, pending, config, notifier, results, shared) for _ in range(workers)]
+        for future in futures:
+            future.result()
+
+
+def _run_worker(
+    pending: "queue.Queue[UserCredential]",
+    config: AppConfig,
+    notifier: Notifier,
+    results: dict[str, str],
+    shared: RunContext,
+) -> None:
+    from playwright.sync_api import sync_playwright
+
+    from .purchaser import EastmoneyPurchaser
+
+    with sync_playwright() as playwright:
+        browser = launch_browser_timed(playwright, config)
+        purchaser = EastmoneyPurchaser(
+            browser, config, latency=shared.latency, deadline=shared.deadline, artifacts=shared.artifacts
+        )
 
         try:
-            for user in config.users:
+            while True:
                 try:
-                    result = purchaser.run_for_user(user)
-                    message = f"[{user.account}] {result}"
-                    send_pushplus(message, user.account, config.pushplus_token)
-                except Exception as exc:
-                    message = f"[{user.account}] 打新债失败，{normalize_message(str(exc))}"
-                    send_pushplus(message, user.account, config.pushplus_token)
+                    user = pending.get_nowait()
+                except queue.Empty:
+                    return
+                # 队列已空时其他线程也不会再放入账号，本线程跑完这个就结束
+                results[user.account] = _process_user(purchaser, user, notifier, more_users=not pending.empty())
         finally:
+            purchaser.close()
             browser.close()
 
 
+def launch_browser_timed(playwright: "Playwright", config: AppConfig) -> "Browser":
+    from .purchaser import launch_browser
+
+    with tracer.span("browser_launch") as span:
+        browser = launch_browser(playwright, config.browser, config.headless)
+    print(f"浏览器启动完成，耗时 {span.duration:.2f}s")
+    return browser
+
+
+def _export_traces(config: AppConfig) -> None:
+    print(tracer.summary())
+    try:
+        if config.trace_file:
+            tracer.export_jsonl(config.trace_file)
+        if config.metrics_file:
+            tracer.export_prometheus(config.metrics_file)
+    except Exception as exc:
+        print(f"耗时数据导出失败: {exc}")
+
+
+def _record_history(config: AppConfig, started_at: float, results: dict[str, str]) -> None:
+    if not config.history_db or not results:
+        return
+    try:
+        record_run(config.history_db, started_at, results, tracer.snapshot())
+    except Exception as exc:
+        print(f"运行历史写入失败: {exc}")
+
+
+def _create_latency_stats(config: AppConfig) -> Optional[LatencyStats]:
+    if not config.adaptive_timeouts:
+        return None
+    return LatencyStats(config.latency_stats_file, config.timeout_floor_ms, config.timeout_ceiling_ms)
+
+
+def _save_latency(latency: Optional[LatencyStats]) -> None:
+    if latency is None:
+        return
+    try:
+        latency.save()
+    except Exception as exc:
+        print(f"耗时统计保存失败: {exc}")
+
+
+def _process_user(
+    purchaser: "EastmoneyPurchaser", user: UserCredential, notifier: Notifier, more_users: bool = True
+) -> str:
+    try:
+        result = purchaser.run_for_user(user, more_users=more_users)
+        message = f"[{user.account}] {result}"
+    except Exception as exc:
+        message = f"[{user.account}] 打新债失败，{normalize_message(str(exc))}"
+    notifier.notify(message, user.account)
+    return message
+
+
 def normalize_message(text: str) -> str:
     return " ".join(text.replace("\r", " ").replace("\n", " ").split())
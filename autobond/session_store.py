@@ -0,0 +1,65 @@
+import base64
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+
+class SessionStore:
+    """按账号加密保存 Playwright storage_state，供下次运行跳过登录与验证码"""
+
+    def __init__(self, directory: str, secret: str, max_age_hours: int):
+        try:
+            from cryptography.fernet import Fernet
+        except ImportError as exc:
+            raise RuntimeError("启用 SESSION_DIR 需要安装 cryptography: uv sync --extra session") from exc
+
+        if not secret:
+            raise ValueError("启用 SESSION_DIR 时必须设置 SESSION_KEY")
+
+        self.directory = Path(directory)
+        self.max_age_seconds = max_age_hours * 3600
+        self._secret = secret
+        self._fernet = Fernet(base64.urlsafe_b64encode(hashlib.sha256(secret.encode("utf-8")).digest()))
+
+    def load(self, account: str) -> Optional[dict]:
+        path = self._path(account)
+        if not path.exists():
+            return None
+
+        try:
+            payload = json.loads(self._fernet.decrypt(path.read_bytes()))
+        except Exception:
+            # 密钥更换或文件损坏，直接作废
+            self.delete(account)
+            return None
+
+        if time.time() - payload.get("saved_at", 0) > self.max_age_seconds:
+            self.delete(account)
+            return None
+        return payload.get("storage_state")
+
+    def save(self, account: str, storage_state: dict) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(account)
+        token = self._fernet.encrypt(
+            json.dumps({"saved_at": time.time(), "storage_state": storage_state}).encode("utf-8")
+        )
+
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(token)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, path)
+
+    def delete(self, account: str) -> None:
+        try:
+            self._path(account).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _path(self, account: str) -> Path:
+        # 文件名不暴露账号
+        digest = hashlib.sha256(f"{self._secret}:{account}".encode("utf-8")).hexdigest()
+        return self.directory / f"{digest[:32]}.session"
@@ -0,0 +1,196 @@
+"""
+分片运行
+
+账号较多时，单个进程里 Chromium 渲染与验证码推理抢同一批 CPU，并发再高也有上限。
+按账号在 USERS 中的位置轮流分到 N 个分片，每个分片是独立进程、各自启动浏览器与加载模型：
+
+    # 本机多进程：启动 4 个分片进程，结束后合并为一条报告与推送
+    python main.py --processes 4
+
+    # 多台机器：各跑一个分片并写出结果，不推送；最后汇总推送
+    python main.py --shard 1/3 --results-file shard1.json --no-notify
+    python main.py --merge shard1.json shard2.json shard3.json
+"""
+import json
+import multiprocessing
+import os
+import tempfile
+from dataclasses import replace
+from datetime import datetime
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from .config import AppConfig, UserCredential, load_config
+from .notifier import Notifier
+from .runner import is_closed_today, known_no_bonds, prepare_run, run_once
+
+
+def parse_shard(text: str) -> tuple[int, int]:
+    """
+    解析 "i/N"，i 从 1 开始
+
+    Returns:
+        (i, N)
+    """
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise ValueError(f"分片格式错误: {text}，应为 i/N，如 1/4") from None
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"分片序号超出范围: {text}，i 应在 1~N 之间")
+    return index, count
+
+
+def select_shard(users: list[UserCredential], index: int, count: int) -> list[UserCredential]:
+    """按位置轮流分配，同一份 USERS 在任何机器上分得的结果都相同，且各分片账号数最多相差 1"""
+    return users[index - 1::count]
+
+
+def shard_config(config: AppConfig, index: int, count: int) -> AppConfig:
+    """
+    分片自己的配置：只保留本分片的账号，Prometheus textfile 按分片分开写，避免互相覆盖
+    """
+    metrics_file = config.metrics_file
+    if metrics_file and count > 1:
+        path = Path(metrics_file)
+        metrics_file = str(path.with_name(f"{path.stem}.shard{index}{path.suffix}"))
+    return replace(config, users=select_shard(config.users, index, count), metrics_file=metrics_file)
+
+
+def run_shard(index: int, count: int, results_file: str = "", notify: bool = True) -> dict[str, str]:
+    """执行一个分片，可选把结果写入文件供 --merge 汇总"""
+    load_dotenv()
+    config = load_config()
+    results: dict[str, str] = {}
+
+    closed = is_closed_today(config)
+    if not closed:
+        config = shard_config(config, index, count)
+        print(f"分片 {index}/{count}，账号 {len(config.users)} 个")
+        if config.users:
+            prepare_run(config)
+            results = run_once(config, notify=notify)
+
+    if results_file:
+        # 休市时写明原因，汇总时不会把本分片的账号当成异常退出
+        write_results(results_file, f"{index}/{count}", results, closed=closed)
+    return results
+
+
+def run_processes(processes: int) -> None:
+    """本机启动多个分片进程，结束后合并结果统一报告与推送"""
+    load_dotenv()
+    config = load_config()
+    if is_closed_today(config):
+        return
+
+    processes = min(processes, len(config.users))
+    if processes <= 1 or known_no_bonds(config):
+        # 不值得再起子进程
+        prepare_run(config)
+        run_once(config)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="autobond-shards-") as directory:
+        # spawn 启动全新解释器，各分片不共享 Playwright 与模型状态
+        ctx = multiprocessing.get_context("spawn")
+        workers = []
+        for index in range(1, processes + 1):
+            path = os.path.join(directory, f"shard{index}.json")
+            process = ctx.Process(
+                target=run_shard,
+                args=(index, processes, path, False),
+                name=f"autobond-shard{index}",
+            )
+            process.start()
+            workers.append((index, path, process))
+
+        shard_results = []
+        for index, path, process in workers:
+            process.join()
+            if process.exitcode != 0:
+                print(f"分片 {index}/{processes} 异常退出，退出码 {process.exitcode}")
+            shard_results.append(read_results(path)[0] if os.path.exists(path) else {})
+
+    results = {}
+    for shard_result in shard_results:
+        results.update(shard_result)
+    report(config, results, shards=processes)
+
+
+def write_results(path: str, shard: str, results: dict[str, str], closed: bool = False) -> None:
+    """
+    Args:
+        closed: 交易日历显示今天休市，分片没有运行任何账号
+    """
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "shard": shard,
+        "finished_at": datetime.now().isoformat(timespec="seconds"),
+        "closed": closed,
+        "results": [{"account": account, "message": message} for account, message in results.items()],
+    }
+    tmp_path = target.with_suffix(target.suffix + ".tmp")
+    tmp_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp_path, target)
+
+
+def read_results(path: str) -> tuple[dict[str, str], bool]:
+    """
+    Returns:
+        (账号 -> 结果消息, 分片是否因休市未运行)
+    """
+    payload = json.loads(Path(path).read_text(encoding="utf-8"))
+    results = {item["account"]: item["message"] for item in payload.get("results", [])}
+    return results, bool(payload.get("closed", False))
+
+
+def merge(paths: list[str]) -> None:
+    """汇总多台机器写出的分片结果，统一报告与推送"""
+    load_dotenv()
+    config = load_config()
+
+    results: dict[str, str] = {}
+    closed = False
+    for path in paths:
+        try:
+            shard_results, shard_closed = read_results(path)
+        except Exception as exc:
+            print(f"读取分片结果失败 {path}: {exc}")
+            continue
+        results.update(shard_results)
+        closed = closed or shard_closed
+    report(config, results, shards=len(paths), closed=closed)
+
+
+def report(config: AppConfig, results: dict[str, str], shards: int, closed: bool = False) -> None:
+    """
+    按 USERS 顺序汇总为一条报告，缺失结果的账号单独标出，整体作为一条消息推送
+
+    Args:
+        closed: 有分片因交易日历显示休市而未运行；此时缺失结果的账号按休市处理，不当作异常退出
+    """
+    if closed and not results:
+        # 与单进程运行一致，休市日不推送
+        print(f"分片汇总: {shards} 个分片均因交易日历显示今天休市未运行")
+        return
+
+    missing_message = "目前不能打新债（交易日历显示今天休市）" if closed else "未返回结果，所在分片可能异常退出"
+    lines = []
+    for user in config.users:
+        lines.append(results.get(user.account, f"[{user.account}] {missing_message}"))
+    missing = sum(1 for user in config.users if user.account not in results)
+
+    print()
+    print(f"分片汇总: {shards} 个分片，{len(config.users)} 个账号，{missing} 个未返回结果")
+    notifier = Notifier(
+        config.pushplus_token,
+        url=config.pushplus_url,
+        digest=True,
+        retries=config.notify_retries,
+    )
+    for line in lines:
+        notifier.notify(line, "")
+    notifier.close()
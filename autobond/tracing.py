@@ -0,0 +1,145 @@
+"""
+分阶段计时
+
+用法:
+    with tracer.context(account=user.account, attempt=attempt):
+        with tracer.span("captcha") as span:
+            ...
+        print(span.duration)
+
+context 设置的属性会带到当前线程内的所有 span 上；span 内抛出异常时 outcome 记为 error。
+结果可导出为 JSON Lines 与 Prometheus textfile（node_exporter textfile collector 格式）。
+"""
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Iterator
+
+QUANTILES = (0.5, 0.9, 0.95)
+
+
+def percentile(values: list[float], q: float) -> float:
+    """
+    最近秩分位数，q 取 0~1（如 0.95），不插值；各处统计 p50/p95 都用它，口径一致
+    """
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered), math.ceil(q * len(ordered))) - 1)]
+
+
+@dataclass
+class Span:
+    name: str
+    # 开始时间（Unix 时间戳）
+    start: float
+    duration: float = 0.0
+    outcome: str = "ok"
+    attributes: dict = field(default_factory=dict)
+
+
+class Tracer:
+    def __init__(self):
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def context(self, **attributes) -> Iterator[None]:
+        previous = getattr(self._local, "attributes", {})
+        self._local.attributes = {**previous, **attributes}
+        try:
+            yield
+        finally:
+            self._local.attributes = previous
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        span = Span(
+            name=name,
+            start=time.time(),
+            attributes={**getattr(self._local, "attributes", {}), **attributes},
+        )
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException:
+            span.outcome = "error"
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            with self._lock:
+                self.spans.append(span)
+
+    def reset(self) -> None:
+        """清空已记录的 span，常驻进程每轮运行开始时调用"""
+        with self._lock:
+            self.spans = []
+
+    def snapshot(self) -> list[Span]:
+        with self._lock:
+            return list(self.spans)
+
+    def summary(self) -> str:
+        """按阶段汇总的耗时表，用于日志输出"""
+        by_phase: dict[str, list[float]] = {}
+        for span in self.snapshot():
+            by_phase.setdefault(span.name, []).append(span.duration)
+
+        lines = ["阶段耗时:"]
+        for phase, durations in by_phase.items():
+            lines.append(
+                f"  {phase:<16} 次数 {len(durations):>3}  合计 {sum(durations):>7.2f}s  最长 {max(durations):>6.2f}s"
+            )
+        return "\n".join(lines)
+
+    def export_jsonl(self, path: str) -> None:
+        """追加写入 JSON Lines，每行一个 span"""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for span in self.snapshot():
+                f.write(json.dumps(asdict(span), ensure_ascii=False, default=str) + "\n")
+
+    def export_prometheus(self, path: str) -> None:
+        """按阶段汇总为 Prometheus summary，原子替换写入"""
+        by_phase: dict[str, list[Span]] = {}
+        for span in self.snapshot():
+            by_phase.setdefault(span.name, []).append(span)
+
+        lines = [
+            "# HELP autobond_phase_duration_seconds Duration of each autobond phase in the last run.",
+            "# TYPE autobond_phase_duration_seconds summary",
+        ]
+        for phase, spans in sorted(by_phase.items()):
+            durations = [span.duration for span in spans]
+            for q in QUANTILES:
+                value = percentile(durations, q)
+                lines.append(f'autobond_phase_duration_seconds{{phase="{phase}",quantile="{q}"}} {value:.6f}')
+            lines.append(f'autobond_phase_duration_seconds_sum{{phase="{phase}"}} {sum(durations):.6f}')
+            lines.append(f'autobond_phase_duration_seconds_count{{phase="{phase}"}} {len(durations)}')
+
+        lines += [
+            "# HELP autobond_phase_errors_total Failed spans of each autobond phase in the last run.",
+            "# TYPE autobond_phase_errors_total gauge",
+        ]
+        for phase, spans in sorted(by_phase.items()):
+            errors = sum(1 for span in spans if span.outcome == "error")
+            lines.append(f'autobond_phase_errors_total{{phase="{phase}"}} {errors}')
+
+        lines += [
+            "# HELP autobond_last_run_timestamp_seconds Unix time the metrics were written.",
+            "# TYPE autobond_last_run_timestamp_seconds gauge",
+            f"autobond_last_run_timestamp_seconds {time.time():.0f}",
+        ]
+
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_suffix(target.suffix + ".tmp")
+        tmp_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(tmp_path, target)
+
+
+tracer = Tracer()
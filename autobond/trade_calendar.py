@@ -0,0 +1,102 @@
+"""
+交易日历
+
+运行前先查本地日历，周末与已知节假日直接退出，不导入 Playwright、不启动浏览器、不加载验证码模型。
+日历随代码附带（data/trade_holidays.json），可用 TRADE_CALENDAR_FILE 指向更新后的文件；
+日历未覆盖的年份按“未知”处理，照常交给站点判断。本模块只依赖标准库。
+"""
+import json
+from datetime import date, datetime, timedelta, timezone, tzinfo
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+BUNDLED_CALENDAR = Path(__file__).parent / "data" / "trade_holidays.json"
+EXCHANGE_TIMEZONE = "Asia/Shanghai"
+
+# 未安装 tzdata 的精简镜像里 zoneinfo 找不到时区数据，北京时间没有夏令时，可用固定偏移代替
+_FIXED_ZONES = {"Asia/Shanghai": timezone(timedelta(hours=8), "CST")}
+
+
+def resolve_timezone(name: str) -> tzinfo:
+    try:
+        return ZoneInfo(name)
+    except ZoneInfoNotFoundError:
+        pass
+    if name in _FIXED_ZONES:
+        return _FIXED_ZONES[name]
+    raise ValueError(f"未知时区: {name}，请安装 tzdata 或改用 Asia/Shanghai")
+
+
+def exchange_today() -> date:
+    """交易所所在时区（北京时间）的当天日期"""
+    return datetime.now(resolve_timezone(EXCHANGE_TIMEZONE)).date()
+
+
+class TradeCalendar:
+    def __init__(self, holidays: dict[int, set[date]]):
+        """
+        Args:
+            holidays: 年份 -> 该年周一至周五的休市日
+        """
+        self.holidays = holidays
+
+    @classmethod
+    def load(cls, path: str = "") -> "TradeCalendar":
+        """
+        读取日历文件，格式: {"holidays": {"2026": ["2026-01-01", ...]}}
+
+        Args:
+            path: 日历文件路径，为空时使用随代码附带的日历
+        """
+        data = json.loads(Path(path or BUNDLED_CALENDAR).read_text(encoding="utf-8"))
+        return cls(
+            {
+                int(year): {date.fromisoformat(day) for day in days}
+                for year, days in data.get("holidays", {}).items()
+            }
+        )
+
+    def is_trading_day(self, day: date) -> Optional[bool]:
+        """
+        Returns:
+            True 交易日 / False 休市 / None 日历未覆盖该年份
+        """
+        if day.weekday() >= 5:
+            return False
+        if day.year not in self.holidays:
+            return None
+        return day not in self.holidays[day.year]
+
+
+@lru_cache(maxsize=None)
+def load_calendar(path: str = "") -> TradeCalendar:
+    return TradeCalendar.load(path)
+
+
+def check_today(path: str = "") -> Optional[bool]:
+    """
+    查询今天是否交易日，日历文件读取失败时返回 None，不影响照常运行
+
+    Args:
+        path: 日历文件路径，为空时使用随代码附带的日历
+    """
+    today = exchange_today()
+    try:
+        trading = load_calendar(path).is_trading_day(today)
+    except Exception as exc:
+        print(f"交易日历读取失败，交由站点判断: {exc}")
+        return None
+    if trading is None:
+        print(f"交易日历未覆盖 {today.year} 年，交由站点判断，请更新 TRADE_CALENDAR_FILE")
+    return trading
+
+
+if __name__ == "__main__":
+    # 供 CI 在安装依赖前判断：python autobond/trade_calendar.py [日历文件]，休市时退出码为 1
+    import sys
+
+    trading = check_today(sys.argv[1] if len(sys.argv) > 1 else "")
+    print(f"{exchange_today()} {'休市' if trading is False else '交易日'}")
+    sys.exit(1 if trading is False else 0)
@@ -0,0 +1,118 @@
+"""
+页面内事件驱动的等待原语
+
+每个等待都在页面里用 MutationObserver 观察 DOM，条件一满足立即返回，
+整个等待只需要一次 page.evaluate，不再在 Python 侧轮询。
+"""
+from playwright.sync_api import Page
+
+# predicate 在页面内执行，返回真值即结束等待；memo 用于跨次检查保存状态。
+# 低频的 setInterval 兜底样式表加载等不触发 DOM 变化的情况。
+_WAIT_TEMPLATE = """
+(args) => new Promise((resolve, reject) => {
+    const memo = {};
+    const isVisible = (el) => {
+        if (!el) return false;
+        const style = window.getComputedStyle(el);
+        if (style.visibility === 'hidden' || style.display === 'none') return false;
+        return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    };
+    const predicate = () => { %s };
+    let done = false;
+    let observer = null;
+    let poller = null;
+    let timer = null;
+    const stop = () => {
+        done = true;
+        if (observer) observer.disconnect();
+        clearInterval(poller);
+        clearTimeout(timer);
+    };
+    const finish = (value) => {
+        if (done) return;
+        stop();
+        resolve(value);
+    };
+    const check = () => {
+        if (done) return;
+        let value = null;
+        try {
+            value = predicate();
+        } catch (e) {
+            // 脚本出错不能当成超时，否则表格等待会被误判为“无可申购”
+            stop();
+            reject(e);
+            return;
+        }
+        if (value) finish(value);
+    };
+    observer = new MutationObserver(check);
+    observer.observe(document.documentElement, {
+        childList: true,
+        subtree: true,
+        attributes: true,
+        characterData: true,
+    });
+    poller = setInterval(check, 100);
+    timer = setTimeout(() => finish(null), args.timeoutMs);
+    check();
+})
+"""
+
+_TABLE_STATE = """
+const body = document.querySelector('#tableBody');
+if (!body) return null;
+if (body.querySelector("input[name='chkitem']:not(:disabled)")) return 'rows';
+
+// “暂无数据”或只有不可勾选的行时，可能只是数据还没加载完，要求状态保持一段时间不变
+const text = body.innerText.replace(/\\s+/g, ' ').trim();
+const settled = text.includes('暂无数据') || body.querySelector("input[name='chkitem']");
+if (!settled) {
+    memo.since = null;
+    return null;
+}
+if (memo.text !== text) {
+    memo.text = text;
+    memo.since = Date.now();
+}
+return Date.now() - memo.since >= args.settleMs ? 'empty' : null;
+"""
+
+_DIALOG_OR_CONFIRM = """
+if (isVisible(document.querySelector('#Cxc_Dialog'))) return 'dialog';
+for (const button of document.querySelectorAll('#btnConfirm')) {
+    if (isVisible(button)) return 'confirm';
+}
+return null;
+"""
+
+_CHECKED_ROWS = """
+return document.querySelector("#tableBody input[name='chkitem']:checked") ? 'checked' : null;
+"""
+
+
+def wait_in_page(page: Page, predicate: str, timeout_ms: int, **args) -> str:
+    """
+    在页面内等待 predicate 返回真值，超时返回空字符串
+
+    页面跳转（执行上下文被销毁）或 predicate 出错时直接抛出异常，由调用方按失败处理并重试，
+    不会与超时混为一谈。
+    """
+    return page.evaluate(_WAIT_TEMPLATE % predicate, {"timeoutMs": timeout_ms, **args}) or ""
+
+
+def wait_for_table_state(page: Page, timeout_ms: int, settle_ms: int) -> str:
+    """
+    等待申购列表就绪，返回 'rows'（有可勾选的行）、'empty'（无数据状态持续 settle_ms 不变）或空字符串（超时）
+    """
+    return wait_in_page(page, _TABLE_STATE, timeout_ms, settleMs=settle_ms)
+
+
+def wait_for_dialog_or_confirm(page: Page, timeout_ms: int) -> str:
+    """等待提示弹窗或申购确认按钮出现，返回 'dialog'、'confirm' 或空字符串（超时）"""
+    return wait_in_page(page, _DIALOG_OR_CONFIRM, timeout_ms)
+
+
+def wait_for_checked_rows(page: Page, timeout_ms: int) -> bool:
+    """等待至少一行被勾选"""
+    return bool(wait_in_page(page, _CHECKED_ROWS, timeout_ms))
@@ -0,0 +1,164 @@
+"""
+申购全流程耗时基准
+
+启动本地模拟站点，用与线上相同的入口 autobond.run() 跑 N 个账号，
+按服务端记录的时间点统计各阶段与总耗时的分位数。
+
+开启 CONTEXT_PREWARM 时，下一个账号的登录页在上一个账号运行期间就已加载，
+服务端的登录页请求早于账号真正开始的时刻，因此登录阶段与总耗时都从账号取得浏览器上下文
+（进程内 new_context / account span 的起点）算起，不包含在上一个账号期间完成的预热。
+加 --no-prewarm 可关闭预热对比两者。
+
+用法:
+    python -m benchmarks.flow_bench --accounts 10 --concurrency 4 --rows 5 --json bench.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Optional
+
+from autobond.tracing import Span, percentile
+
+from .mock_site import MockSite, Session, add_scenario_arguments, scenario_from_args
+
+# 账号取得浏览器上下文的时刻，由进程内的 new_context span 给出
+ACQUIRED = "acquired"
+
+# (阶段名, 起点事件, 终点事件)
+PHASES = (
+    ("login", ACQUIRED, "login"),
+    ("navigate", "login", "purchase_page"),
+    ("purchase", "purchase_page", "submit"),
+)
+
+
+def summarize(values: list[float]) -> dict:
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "p50": percentile(values, 0.5),
+        "p90": percentile(values, 0.9),
+        "p95": percentile(values, 0.95),
+        "max": max(values),
+    }
+
+
+def _first(session: Session, event: str) -> Optional[float]:
+    return next((t for name, t in session.events if name == event), None)
+
+
+def collect_phase_durations(site: MockSite, spans: list[Span]) -> dict[str, list[float]]:
+    """
+    Args:
+        site: 记录了服务端时间点的模拟站点
+        spans: 本次运行的 span，给出各账号取得上下文的时刻与账号总耗时
+    """
+    acquired: dict[str, float] = {}
+    totals: dict[str, float] = {}
+    for span in sorted(spans, key=lambda item: item.start):
+        account = span.attributes.get("account")
+        if span.name == "new_context":
+            # 按开始时间排序，留下的是最后一次尝试
+            acquired[account] = span.start + span.duration
+        elif span.name == "account":
+            totals[account] = span.duration
+
+    durations: dict[str, list[float]] = {name: [] for name, _, _ in PHASES}
+    durations["total"] = [totals[account] for account in sorted(totals)]
+    for account, sessions in site.sessions_by_account().items():
+        # 重试会产生多个会话，阶段耗时取最后一次尝试
+        sessions.sort(key=lambda item: item.events[0][1])
+        last = sessions[-1]
+        for name, start_event, end_event in PHASES:
+            start = acquired.get(account) if start_event == ACQUIRED else _first(last, start_event)
+            end = _first(last, end_event)
+            if start is not None and end is not None:
+                durations[name].append(end - start)
+    return durations
+
+
+def run_benchmark(args: argparse.Namespace) -> dict:
+    # 延迟导入，保证环境变量在配置加载前设置好
+    from autobond import run
+    from autobond.tracing import tracer
+
+    # 可申购缓存、耗时统计与运行历史都会落盘，每次基准单独一个目录，避免上一次的结果影响本次，也不混进线上的运行历史
+    with MockSite(scenario_from_args(args)) as site, tempfile.TemporaryDirectory() as state_dir:
+        os.environ.update(
+            {
+                "USERS": ",".join(f"mock{i:03d}:password" for i in range(args.accounts)),
+                "TRADE_BASE_URL": site.base_url,
+                "HEADLESS": "false" if args.headed else "true",
+                "MAX_CONCURRENCY": str(args.concurrency),
+                "PUSHPLUS_TOKEN": "mock",
+                "AVAILABILITY_CACHE_DIR": os.path.join(state_dir, "availability"),
+                "LATENCY_STATS_FILE": os.path.join(state_dir, "latency.json"),
+                "HISTORY_DB": os.path.join(state_dir, "history.db"),
+                "TRADE_CALENDAR": "false",
+                "TRADE_CALENDAR_VERIFY": "false",
+                "PUSHPLUS_URL": f"{site.base_url}/pushplus/send",
+                "NOTIFY_DIGEST": "true" if args.notify_digest else "false",
+                "CONTEXT_PREWARM": "false" if args.no_prewarm else "true",
+            }
+        )
+
+        started = time.perf_counter()
+        run()
+        wall_time = time.perf_counter() - started
+
+        durations = collect_phase_durations(site, tracer.snapshot())
+        pushes = len(site.pushes)
+
+    return {
+        "accounts": args.accounts,
+        "concurrency": args.concurrency,
+        "prewarm": not args.no_prewarm,
+        "wall_time": wall_time,
+        "pushes": pushes,
+        "phases": {name: summarize(values) for name, values in durations.items()},
+    }
+
+
+def print_report(report: dict) -> None:
+    print()
+    print(
+        f"账号数: {report['accounts']}, 并发数: {report['concurrency']}, "
+        f"预热: {'开' if report['prewarm'] else '关'}, "
+        f"总耗时: {report['wall_time']:.2f}s, 推送: {report['pushes']} 条"
+    )
+    print(f"{'阶段':<10}{'次数':>6}{'p50':>9}{'p90':>9}{'p95':>9}{'max':>9}")
+    for name, stats in report["phases"].items():
+        if not stats["count"]:
+            print(f"{name:<10}{0:>6}")
+            continue
+        print(
+            f"{name:<10}{stats['count']:>6}"
+            + "".join(f"{stats[key]:>8.2f}s" for key in ("p50", "p90", "p95", "max"))
+        )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="申购全流程耗时基准")
+    parser.add_argument("--accounts", type=int, default=5, help="账号数量")
+    parser.add_argument("--concurrency", type=int, default=1, help="并发数 (MAX_CONCURRENCY)")
+    parser.add_argument("--headed", action="store_true", help="显示浏览器窗口")
+    parser.add_argument("--no-prewarm", action="store_true", help="关闭上下文预热 (CONTEXT_PREWARM=false)")
+    parser.add_argument("--notify-digest", action="store_true", help="推送合并为一条 (NOTIFY_DIGEST)")
+    parser.add_argument("--json", default="", help="结果写入 JSON 文件")
+    add_scenario_arguments(parser)
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,431 @@
+"""
+本地模拟交易站点
+
+覆盖申购流程会访问的页面：登录页（含 #imgValidCode 验证码）、非交易日弹窗、
+新股新债菜单、/Trade/XzsgBatPurchase 批量申购页以及各种 #Cxc_Dialog 提示，
+另有 /pushplus/send 作为 PushPlus 推送接口的替身（设置 PUSHPLUS_URL 指向它）。
+每个请求都会按会话记录时间点，供基准测试按阶段统计耗时。
+
+单独启动: python -m benchmarks.mock_site --port 8000 --rows 3
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+import cv2
+import numpy as np
+
+
+@dataclass
+class Scenario:
+    # 可申购债券数量，0 表示“暂无数据”
+    rows: int = 3
+    # 申购列表从请求到渲染的延迟
+    render_delay_ms: int = 300
+    # 登录页弹出“非交易日”提示
+    non_trade_day: bool = False
+    # 登录后弹出需要点击确定的公告
+    login_notice: bool = True
+    # 点击批量申购后直接弹出的提示（如“当前没有可申购的债券”），为空则进入申购确认
+    dialog_message: str = ""
+    # 校验验证码；默认任意 4 位数字都放行，便于不依赖模型精度测流程耗时
+    strict_captcha: bool = False
+    # 带标签的验证码图片目录，文件名前 4 位为答案；为空则现场生成
+    captcha_dir: str = ""
+    # 推送接口的响应延迟，用于验证慢推送不拖慢申购
+    push_delay_ms: int = 0
+    # 推送接口前 N 次请求返回 500，用于验证重试
+    push_failures: int = 0
+
+
+@dataclass
+class Session:
+    sid: str
+    account: str = ""
+    captcha: str = ""
+    logged_in: bool = False
+    # [(事件, Unix 时间戳)]，与 autobond.tracing 的 span 同一时钟
+    events: list[tuple[str, float]] = field(default_factory=list)
+
+
+class MockSite:
+    def __init__(self, scenario: Scenario, host: str = "127.0.0.1", port: int = 0):
+        self.scenario = scenario
+        self.sessions: dict[str, Session] = {}
+        # 推送替身收到的消息 [(title, content, Unix 时间戳)]
+        self.pushes: list[tuple[str, str, float]] = []
+        self._push_requests = 0
+        self._lock = threading.Lock()
+        self._captchas = _load_labeled_captchas(scenario.captcha_dir)
+        self.server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockSite":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="mock-site", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "MockSite":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def session(self, sid: Optional[str]) -> Session:
+        with self._lock:
+            if not sid or sid not in self.sessions:
+                sid = uuid.uuid4().hex
+                self.sessions[sid] = Session(sid=sid)
+            return self.sessions[sid]
+
+    def record(self, session: Session, event: str) -> None:
+        with self._lock:
+            session.events.append((event, time.time()))
+
+    def record_push(self, payload: dict) -> bool:
+        """记录一次推送请求，返回是否按场景模拟失败"""
+        with self._lock:
+            self._push_requests += 1
+            if self._push_requests <= self.scenario.push_failures:
+                return False
+            self.pushes.append((payload.get("title", ""), payload.get("content", ""), time.time()))
+            return True
+
+    def sessions_by_account(self) -> dict[str, list[Session]]:
+        grouped: dict[str, list[Session]] = {}
+        with self._lock:
+            for session in self.sessions.values():
+                if session.account:
+                    grouped.setdefault(session.account, []).append(session)
+        return grouped
+
+    def next_captcha(self) -> tuple[str, bytes]:
+        if self._captchas:
+            return random.choice(self._captchas)
+        code = "".join(random.choice("0123456789") for _ in range(4))
+        return code, _render_captcha(code)
+
+    def bonds(self) -> list[dict]:
+        return [
+            {
+                "SUBCODE": f"{754000 + i:06d}",
+                "SUBNAME": f"模拟转债{i + 1}",
+                "LIMITBUYVOL": 10000,
+                "STATUS": "可申购",
+            }
+            for i in range(self.scenario.rows)
+        ]
+
+
+def _load_labeled_captchas(directory: str) -> list[tuple[str, bytes]]:
+    if not directory:
+        return []
+    captchas = []
+    for path in sorted(Path(directory).iterdir()):
+        label = path.stem[:4]
+        if path.suffix.lower() in {".png", ".jpg", ".jpeg"} and label.isdigit():
+            captchas.append((label, path.read_bytes()))
+    return captchas
+
+
+def _render_captcha(code: str) -> bytes:
+    img = np.full((30, 100, 3), 255, dtype=np.uint8)
+    for i, digit in enumerate(code):
+        color = tuple(random.randint(0, 120) for _ in range(3))
+        cv2.putText(img, digit, (8 + i * 22, 23), cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
+    ok, encoded = cv2.imencode(".png", img)
+    return encoded.tobytes()
+
+
+def _make_handler(site: MockSite):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            path = urlparse(self.path).path
+            session = site.session(self._sid())
+
+            if path == "/Login":
+                site.record(session, "login_page")
+                self._send_html(_login_page(site.scenario), session)
+            elif path == "/Login/YZM":
+                site.record(session, "captcha")
+                session.captcha, image = site.next_captcha()
+                self._send(200, image, "image/png", session)
+            elif path in {"/Trade/Buy", "/Trade/XzsgBatPurchase"}:
+                if not session.logged_in:
+                    self._redirect("/Login?el=1&clear=&returl=%2fTrade%2fBuy", session)
+                    return
+                site.record(session, "trade_page" if path == "/Trade/Buy" else "purchase_page")
+                if path == "/Trade/Buy":
+                    self._send_html(_trade_page(site.scenario), session)
+                else:
+                    self._send_html(_purchase_page(site.scenario), session)
+            else:
+                self._send(404, b"not found", "text/plain", session)
+
+        def do_POST(self) -> None:
+            path = urlparse(self.path).path
+            session = site.session(self._sid())
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length).decode("utf-8")
+            form = {key: values[0] for key, values in parse_qs(body).items()}
+
+            if path == "/pushplus/send":
+                time.sleep(site.scenario.push_delay_ms / 1000)
+                if not site.record_push(json.loads(body or "{}")):
+                    self._send(500, b"server error", "text/plain", session)
+                    return
+                self._send_json({"code": 200, "msg": "请求成功", "data": uuid.uuid4().hex}, session)
+            elif path == "/Login/Authentication":
+                site.record(session, "login")
+                session.account = form.get("userId", "")
+                code = form.get("randNumber", "")
+                if not code.isdigit() or (site.scenario.strict_captcha and code != session.captcha):
+                    self._send_json({"Status": -1, "Message": "验证码错误"}, session)
+                    return
+                session.logged_in = True
+                self._send_json({"Status": 0, "Message": ""}, session)
+            elif path == "/Trade/GetConvertibleBondListV2":
+                site.record(session, "bond_list")
+                self._send_json({"Status": 0, "Message": None, "Data": site.bonds()}, session)
+            elif path == "/Trade/SubmitBatTradeV2":
+                site.record(session, "submit")
+                codes = [code for code in form.get("codes", "").split(",") if code]
+                self._send_json({"Status": 0, "Message": f"委托成功，共 {len(codes)} 只", "Data": codes}, session)
+            else:
+                self._send(404, b"not found", "text/plain", session)
+
+        def _sid(self) -> Optional[str]:
+            cookie = SimpleCookie(self.headers.get("Cookie", ""))
+            morsel = cookie.get("mock_sid")
+            return morsel.value if morsel else None
+
+        def _send_html(self, html: str, session: Session) -> None:
+            self._send(200, html.encode("utf-8"), "text/html; charset=utf-8", session)
+
+        def _send_json(self, payload: dict, session: Session) -> None:
+            self._send(200, json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json", session)
+
+        def _redirect(self, location: str, session: Session) -> None:
+            self.send_response(302)
+            self.send_header("Location", location)
+            self.send_header("Content-Length", "0")
+            self.send_header("Set-Cookie", f"mock_sid={session.sid}; Path=/")
+            self.end_headers()
+
+        def _send(self, status: int, body: bytes, content_type: str, session: Session) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.send_header("Set-Cookie", f"mock_sid={session.sid}; Path=/")
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+_STYLE = """
+<style>
+  .hidden { display: none; }
+  .popup { position: fixed; top: 30%; left: 40%; padding: 20px; background: #fff; border: 1px solid #999; }
+</style>
+"""
+
+
+def _login_page(scenario: Scenario) -> str:
+    popup = ""
+    if scenario.non_trade_day:
+        popup = """
+<div id="tradePopup" class="popup hidden">
+  <p>今日为非交易日</p>
+  <button class="btn-orange vbtn-confirm" onclick="this.parentNode.classList.add('hidden')">确定</button>
+</div>
+<script>setTimeout(() => document.getElementById('tradePopup').classList.remove('hidden'), 300);</script>
+"""
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>模拟登录</title>{_STYLE}</head>
+<body>
+{popup}
+<input id="txtZjzh" placeholder="资金账号">
+<input id="txtPwd" type="password" placeholder="交易密码">
+<input id="txtValidCode" placeholder="验证码">
+<img id="imgValidCode" src="/Login/YZM?randNum={random.random()}"
+     onclick="this.src='/Login/YZM?randNum=' + Math.random()">
+<button id="btnConfirm">登录</button>
+<p id="loginError"></p>
+<script>
+document.getElementById('btnConfirm').onclick = async () => {{
+  const body = new URLSearchParams({{
+    userId: document.getElementById('txtZjzh').value,
+    password: document.getElementById('txtPwd').value,
+    randNumber: document.getElementById('txtValidCode').value,
+  }});
+  const response = await fetch('/Login/Authentication', {{ method: 'POST', body }});
+  const data = await response.json();
+  if (data.Status === 0) {{
+    location.href = '/Trade/Buy';
+  }} else {{
+    document.getElementById('loginError').innerText = data.Message;
+    document.getElementById('imgValidCode').click();
+  }}
+}};
+</script>
+</body></html>"""
+
+
+_MENU = """
+<ul class="top_menu">
+  <li class="top_item" href="/Trade/NewBuy">
+    <a class="top_a" onclick="this.nextElementSibling.classList.remove('hidden')">新股新债</a>
+    <ul class="sub hidden">
+      <li class="sub_item" data-value="trade/xzsgbatpurchase"><a href="/Trade/XzsgBatPurchase">批量申购</a></li>
+    </ul>
+  </li>
+</ul>
+"""
+
+
+def _trade_page(scenario: Scenario) -> str:
+    notice = ""
+    if scenario.login_notice:
+        notice = """
+<div class="popup">
+  <p>风险提示公告</p>
+  <button class="vbtn-confirm" onclick="this.parentNode.classList.add('hidden')">确定</button>
+</div>
+"""
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>模拟交易</title>{_STYLE}</head>
+<body>{_MENU}{notice}</body></html>"""
+
+
+def _purchase_page(scenario: Scenario) -> str:
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>批量申购</title>{_STYLE}</head>
+<body>
+{_MENU}
+<table>
+  <thead><tr><th><input type="checkbox" id="chk_all"></th><th>代码</th><th>名称</th><th>上限</th></tr></thead>
+  <tbody id="tableBody"></tbody>
+</table>
+<button id="btnBatBuy">批量申购</button>
+<div id="Cxc_Dialog" class="popup hidden">
+  <span class="close">x</span> <span id="dialogText"></span> <button id="btnCxcConfirm">确定</button>
+</div>
+<div id="confirmBox" class="popup hidden"><button id="btnConfirm">确认申购</button></div>
+<script>
+const renderDelay = {scenario.render_delay_ms};
+const dialogMessage = {json.dumps(scenario.dialog_message, ensure_ascii=False)};
+const tableBody = document.getElementById('tableBody');
+const dialog = document.getElementById('Cxc_Dialog');
+const confirmBox = document.getElementById('confirmBox');
+
+const showDialog = (text) => {{
+  document.getElementById('dialogText').innerText = text;
+  dialog.classList.remove('hidden');
+}};
+const checkedCodes = () => Array.from(tableBody.querySelectorAll("input[name='chkitem']:checked"))
+  .map((checkbox) => checkbox.value);
+
+tableBody.innerHTML = '<tr><td colspan="4">加载中</td></tr>';
+fetch('/Trade/GetConvertibleBondListV2', {{ method: 'POST' }})
+  .then((response) => response.json())
+  .then((data) => setTimeout(() => {{
+    if (!data.Data.length) {{
+      tableBody.innerHTML = '<tr><td colspan="4">暂无数据</td></tr>';
+      return;
+    }}
+    tableBody.innerHTML = data.Data.map((bond) => `<tr>
+      <td><input type="checkbox" name="chkitem" value="${{bond.SUBCODE}}"></td>
+      <td>${{bond.SUBCODE}}</td><td>${{bond.SUBNAME}}</td><td>${{bond.LIMITBUYVOL}}</td>
+    </tr>`).join('');
+  }}, renderDelay));
+
+document.getElementById('chk_all').onclick = (event) => {{
+  for (const checkbox of tableBody.querySelectorAll("input[name='chkitem']")) {{
+    checkbox.checked = event.target.checked;
+  }}
+}};
+document.getElementById('btnCxcConfirm').onclick = () => dialog.classList.add('hidden');
+document.getElementById('btnBatBuy').onclick = () => {{
+  if (dialogMessage) return showDialog(dialogMessage);
+  if (!checkedCodes().length) return showDialog('请选择需申购的新债');
+  confirmBox.classList.remove('hidden');
+}};
+document.getElementById('btnConfirm').onclick = async () => {{
+  confirmBox.classList.add('hidden');
+  const body = new URLSearchParams({{ codes: checkedCodes().join(',') }});
+  const response = await fetch('/Trade/SubmitBatTradeV2', {{ method: 'POST', body }});
+  showDialog((await response.json()).Message);
+}};
+</script>
+</body></html>"""
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="启动本地模拟交易站点")
+    parser.add_argument("--port", type=int, default=8000)
+    add_scenario_arguments(parser)
+    args = parser.parse_args(argv)
+
+    site = MockSite(scenario_from_args(args), port=args.port).start()
+    print(f"模拟站点已启动: {site.base_url}，设置 TRADE_BASE_URL={site.base_url} 即可使用")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        site.stop()
+
+
+def add_scenario_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--rows", type=int, default=3, help="可申购债券数量")
+    parser.add_argument("--render-delay-ms", type=int, default=300, help="申购列表渲染延迟")
+    parser.add_argument("--non-trade-day", action="store_true", help="登录页弹出非交易日提示")
+    parser.add_argument("--no-login-notice", action="store_true", help="登录后不弹公告")
+    parser.add_argument("--dialog-message", default="", help="点击批量申购后弹出的提示")
+    parser.add_argument("--strict-captcha", action="store_true", help="校验验证码")
+    parser.add_argument("--captcha-dir", default="", help="带标签的验证码图片目录")
+    parser.add_argument("--push-delay-ms", type=int, default=0, help="推送接口响应延迟")
+    parser.add_argument("--push-failures", type=int, default=0, help="推送接口前 N 次请求返回 500")
+
+
+def scenario_from_args(args: argparse.Namespace) -> Scenario:
+    return Scenario(
+        rows=args.rows,
+        render_delay_ms=args.render_delay_ms,
+        non_trade_day=args.non_trade_day,
+        login_notice=not args.no_login_notice,
+        dialog_message=args.dialog_message,
+        strict_captcha=args.strict_captcha,
+        captcha_dir=args.captcha_dir,
+        push_delay_ms=args.push_delay_ms,
+        push_failures=args.push_failures,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+from .label_process import CaptchaResult
 from .recognizer import CaptchaRecognizer
+from .worker import InferenceWorker
 
-__all__ = ['CaptchaRecognizer']
\ No newline at end of file
+__all__ = ['CaptchaRecognizer', 'CaptchaResult', 'InferenceWorker']
\ No newline at end of file
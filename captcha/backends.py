@@ -0,0 +1,87 @@
+from pathlib import Path
+
+import numpy as np
+
+MODELS_DIR = Path(__file__).parent.parent / "models"
+
+DEFAULT_BACKEND = "keras"
+
+
+class KerasBackend:
+    """Keras/TensorFlow 推理后端（原始模型）"""
+
+    name = "keras"
+    default_model = MODELS_DIR / "VGG.keras"
+
+    def __init__(self, model_path: str):
+        # TensorFlow 只在选用该后端时才导入
+        from keras.models import load_model
+
+        from .model_utils import word_acc
+
+        self.model = load_model(model_path, custom_objects={"word_acc": word_acc})
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        return self.model.predict(batch, verbose=0)
+
+
+class OnnxRuntimeBackend:
+    """onnxruntime 推理后端"""
+
+    name = "onnx"
+    default_model = MODELS_DIR / "VGG.onnx"
+
+    def __init__(self, model_path: str):
+        import onnxruntime as ort
+
+        self.session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        batch = np.asarray(batch, dtype=np.float32)
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenCVDnnBackend:
+    """cv2.dnn 推理后端，无需额外依赖"""
+
+    name = "opencv"
+    default_model = MODELS_DIR / "VGG.onnx"
+
+    def __init__(self, model_path: str):
+        import cv2
+
+        self.net = cv2.dnn.readNetFromONNX(model_path)
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        self.net.setInput(np.asarray(batch, dtype=np.float32))
+        output = self.net.forward()
+        # 部分 OpenCV 版本会把输出压平，这里还原成 (batch, 4, 10)
+        return output.reshape(len(batch), 4, -1)
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (KerasBackend, OnnxRuntimeBackend, OpenCVDnnBackend)
+}
+
+
+def create_backend(name: str, model_path: str = None):
+    """
+    按名称创建推理后端
+
+    Args:
+        name: 后端名称，keras / onnx / opencv
+        model_path: 模型文件路径，默认使用后端对应的 models 下的文件
+
+    Returns:
+        具有 predict(batch) 方法的后端实例
+    """
+    name = (name or DEFAULT_BACKEND).strip().lower()
+    if name not in BACKENDS:
+        raise ValueError(f"CAPTCHA_BACKEND 仅支持 {'/'.join(BACKENDS)}，当前为: {name}")
+
+    backend_cls = BACKENDS[name]
+    if model_path is None:
+        model_path = backend_cls.default_model
+    return backend_cls(str(model_path))
@@ -0,0 +1,179 @@
+"""
+验证码识别离线评测
+
+对一个带标签的验证码图片目录（文件名前 4 位为答案，如 0123_xxx.png），
+逐个推理后端统计整词/逐位准确率、单张识别延迟分位数、不同 batch 大小的吞吐、
+峰值内存与冷启动耗时。每个后端在独立子进程中运行，冷启动与内存互不干扰。
+
+用法:
+    python -m captcha.benchmark data/captcha --backends keras,onnx,opencv --batch-sizes 1,8,32
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import resource
+import sys
+import time
+from pathlib import Path
+from queue import Empty
+
+import numpy as np
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".bmp"}
+
+
+def load_labeled_images(directory: str) -> tuple[list[bytes], list[str]]:
+    """
+    读取带标签的验证码图片
+
+    Args:
+        directory: 图片目录，文件名前 4 位为数字答案
+
+    Returns:
+        (图片字节列表, 标签列表)
+    """
+    images, labels = [], []
+    for path in sorted(Path(directory).iterdir()):
+        label = path.stem[:4]
+        if path.suffix.lower() in IMAGE_SUFFIXES and len(label) == 4 and label.isdigit():
+            images.append(path.read_bytes())
+            labels.append(label)
+    if not images:
+        raise ValueError(f"目录中没有带标签的验证码图片: {directory}")
+    return images, labels
+
+
+def accuracy(predictions: list[str], labels: list[str]) -> tuple[float, float]:
+    """
+    与 model_utils.word_acc 相同的口径：4 位都对才算整词正确
+
+    Returns:
+        (整词准确率, 逐位准确率)
+    """
+    hits = np.array([[p == t for p, t in zip(pred, label)] for pred, label in zip(predictions, labels)])
+    return float(hits.all(axis=1).mean()), float(hits.mean())
+
+
+def percentile(values: list[float], q: float) -> float:
+    """最近秩分位数，q 取 0~1，与 autobond.tracing.percentile 口径相同；captcha 包不依赖 autobond"""
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered), math.ceil(q * len(ordered))) - 1)]
+
+
+def peak_rss_mb() -> float:
+    # Linux 上 ru_maxrss 单位为 KB，macOS 为字节
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def evaluate_backend(backend: str, directory: str, batch_sizes: list[int], rounds: int) -> dict:
+    """在当前进程内评测一个后端，应在新进程中调用以测得冷启动与内存"""
+    started = time.perf_counter()
+    from .image_process import img_process_norm
+    from .label_process import decode_predict
+    from .recognizer import CaptchaRecognizer, decode_image
+
+    images, labels = load_labeled_images(directory)
+    recognizer = CaptchaRecognizer(backend=backend)
+    recognizer.recognize_from_bytes(images[0])
+    cold_start = time.perf_counter() - started
+
+    # 单张识别延迟，包含解码、预处理、推理与后处理
+    latencies = []
+    predictions = []
+    for image in images:
+        t0 = time.perf_counter()
+        predictions.append(recognizer.recognize_from_bytes(image))
+        latencies.append((time.perf_counter() - t0) * 1000)
+    word_acc, digit_acc = accuracy(predictions, labels)
+
+    # 批量吞吐，只计推理本身
+    shape = (CaptchaRecognizer.IMG_WIDTH, CaptchaRecognizer.IMG_HEIGHT)
+    processed = np.empty((len(images), CaptchaRecognizer.IMG_HEIGHT, CaptchaRecognizer.IMG_WIDTH, 3), np.float32)
+    for image, row in zip(images, processed):
+        img_process_norm(decode_image(image), shape=shape, out=row)
+    throughput = {}
+    for batch_size in batch_sizes:
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            for i in range(0, len(processed), batch_size):
+                decode_predict(recognizer.model.predict(processed[i:i + batch_size]))
+        throughput[batch_size] = rounds * len(processed) / (time.perf_counter() - t0)
+
+    return {
+        "backend": backend,
+        "images": len(images),
+        "word_acc": word_acc,
+        "digit_acc": digit_acc,
+        "cold_start_s": cold_start,
+        "latency_ms": {
+            "p50": percentile(latencies, 0.5),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+        },
+        "throughput_per_s": throughput,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _worker(queue, backend: str, directory: str, batch_sizes: list[int], rounds: int) -> None:
+    try:
+        queue.put(evaluate_backend(backend, directory, batch_sizes, rounds))
+    except Exception as exc:
+        queue.put({"backend": backend, "error": f"{type(exc).__name__}: {exc}"})
+
+
+def run_isolated(backend: str, directory: str, batch_sizes: list[int], rounds: int) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_worker, args=(queue, backend, directory, batch_sizes, rounds))
+    process.start()
+    process.join()
+    try:
+        return queue.get(timeout=5)
+    except Empty:
+        return {"backend": backend, "error": f"子进程异常退出，exitcode={process.exitcode}"}
+
+
+def print_report(results: list[dict]) -> None:
+    for result in results:
+        print()
+        if "error" in result:
+            print(f"[{result['backend']}] 不可用: {result['error']}")
+            continue
+        latency = result["latency_ms"]
+        print(f"[{result['backend']}] 图片数: {result['images']}")
+        print(f"  整词准确率: {result['word_acc']:.2%}  逐位准确率: {result['digit_acc']:.2%}")
+        print(f"  冷启动: {result['cold_start_s']:.2f}s  峰值内存: {result['peak_rss_mb']:.0f} MB")
+        print(f"  单张延迟: p50 {latency['p50']:.1f}ms  p95 {latency['p95']:.1f}ms  p99 {latency['p99']:.1f}ms")
+        print(
+            "  批量吞吐: "
+            + "  ".join(f"batch={size} {rate:.0f} 张/s" for size, rate in result["throughput_per_s"].items())
+        )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="验证码识别离线评测")
+    parser.add_argument("directory", help="带标签的验证码图片目录")
+    parser.add_argument("--backends", default="keras,onnx,opencv", help="逗号分隔的后端列表")
+    parser.add_argument("--batch-sizes", default="1,8,32", help="逗号分隔的 batch 大小")
+    parser.add_argument("--rounds", type=int, default=3, help="吞吐测试轮数")
+    parser.add_argument("--json", default="", help="结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",") if size.strip()]
+    results = [
+        run_isolated(backend.strip(), args.directory, batch_sizes, args.rounds)
+        for backend in args.backends.split(",")
+        if backend.strip()
+    ]
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0 if any("error" not in result for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+线上验证码样本集
+
+登录成功即确认了所提交验证码的答案，这类样本可直接用于微调模型；登录未通过的样本也一并保存，
+label 为当时的识别结果，可供人工标注。目录下两个只追加的文件：
+
+    images.bin  原始图片字节依次拼接
+    index.bin   定长记录（RECORD_DTYPE），记录图片在 images.bin 中的位置、标签与结果
+
+读取时两个文件都以 np.memmap 映射，样本量再大也不必整体读入内存。写入使用 O_APPEND，
+每次 os.write 都落在文件末尾，多个分片进程写同一目录也不会互相覆盖；记录自带偏移量，
+两个文件里的顺序不必一致。
+"""
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .recognizer import decode_image
+
+IMAGES_FILE = "images.bin"
+INDEX_FILE = "index.bin"
+
+# 登录结果
+ACCEPTED = 1
+REJECTED = 2
+
+RECORD_DTYPE = np.dtype(
+    [
+        ("offset", "<u8"),
+        ("length", "<u4"),
+        ("label", "S4"),
+        ("outcome", "u1"),
+        ("timestamp", "<f8"),
+    ]
+)
+
+
+class CaptchaDataset:
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory: 样本目录，不存在时在首次写入时创建
+        """
+        self.directory = Path(directory)
+        self.images_path = self.directory / IMAGES_FILE
+        self.index_path = self.directory / INDEX_FILE
+        self._lock = threading.Lock()
+
+    def append(self, image_bytes: bytes, label: str, accepted: bool) -> None:
+        """
+        追加一个样本
+
+        Args:
+            image_bytes: 提交时使用的验证码图片
+            label: 提交的验证码
+            accepted: 登录是否通过
+        """
+        record = np.zeros(1, dtype=RECORD_DTYPE)
+        record["length"] = len(image_bytes)
+        record["label"] = label.encode("ascii", "replace")[:4]
+        record["outcome"] = ACCEPTED if accepted else REJECTED
+        record["timestamp"] = time.time()
+
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            end = _append(self.images_path, image_bytes)
+            record["offset"] = end - len(image_bytes)
+            # 图片写完再写记录，中途退出只会在 images.bin 里留下无人引用的字节
+            _append(self.index_path, record.tobytes())
+
+    def index(self) -> np.ndarray:
+        """全部记录（只读映射），末尾不完整的记录被忽略"""
+        if not self.index_path.exists():
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        count = self.index_path.stat().st_size // RECORD_DTYPE.itemsize
+        if count == 0:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        return np.memmap(self.index_path, dtype=RECORD_DTYPE, mode="r", shape=(count,))
+
+    def labeled(self) -> np.ndarray:
+        """登录通过、标签已确认的记录"""
+        records = self.index()
+        return records[records["outcome"] == ACCEPTED]
+
+    def images(self, records: np.ndarray) -> list[np.ndarray]:
+        """
+        解码一批记录对应的图片
+
+        Returns:
+            BGR 图像列表，与 records 顺序一致
+        """
+        blob = np.memmap(self.images_path, dtype=np.uint8, mode="r")
+        return [
+            decode_image(blob[offset:offset + length].tobytes())
+            for offset, length in zip(records["offset"].tolist(), records["length"].tolist())
+        ]
+
+    def summary(self) -> str:
+        records = self.index()
+        accepted = int((records["outcome"] == ACCEPTED).sum())
+        return f"样本 {len(records)} 个，登录通过 {accepted} 个，未通过 {len(records) - accepted} 个"
+
+
+def _append(path: Path, data: bytes) -> int:
+    """以 O_APPEND 写入，返回写入后本次数据末尾在文件中的位置"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+        return os.lseek(fd, 0, os.SEEK_CUR)
+    finally:
+        os.close(fd)
@@ -0,0 +1,105 @@
+"""
+将 models/VGG.keras 导出为 ONNX 模型，并校验与 Keras 输出一致
+
+用法:
+    python -m captcha.export_onnx [--keras models/VGG.keras] [--output models/VGG.onnx]
+
+依赖 tf2onnx（仅导出时需要）: uv pip install tf2onnx onnxruntime
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from .backends import KerasBackend, OnnxRuntimeBackend, OpenCVDnnBackend
+from .recognizer import CaptchaRecognizer
+
+
+def export(keras_path: str, output_path: str, opset: int = 13) -> None:
+    """
+    导出 ONNX 模型
+
+    Args:
+        keras_path: Keras 模型路径
+        output_path: ONNX 输出路径
+        opset: ONNX opset 版本
+    """
+    import tensorflow as tf
+    import tf2onnx
+
+    model = KerasBackend(keras_path).model
+    spec = (
+        tf.TensorSpec(
+            (None, CaptchaRecognizer.IMG_HEIGHT, CaptchaRecognizer.IMG_WIDTH, 3),
+            tf.float32,
+            name="input",
+        ),
+    )
+    # Keras 3 的模型需要包装成 tf.function 才能被 tf2onnx 转换
+    tf2onnx.convert.from_function(
+        tf.function(lambda x: model(x, training=False)),
+        input_signature=spec,
+        opset=opset,
+        output_path=output_path,
+    )
+    print(f"ONNX 模型已导出: {output_path}")
+
+
+def check_parity(keras_path: str, onnx_path: str, samples: int = 32, atol: float = 1e-4) -> bool:
+    """
+    用随机输入比较 Keras 与 ONNX 后端的输出
+
+    Args:
+        keras_path: Keras 模型路径
+        onnx_path: ONNX 模型路径
+        samples: 随机样本数量
+        atol: 允许的最大绝对误差
+
+    Returns:
+        所有可用后端均与 Keras 一致时返回 True
+    """
+    rng = np.random.default_rng(0)
+    # 与线上预处理一致：输入为 0~255 的像素值
+    batch = rng.integers(
+        0, 256, size=(samples, CaptchaRecognizer.IMG_HEIGHT, CaptchaRecognizer.IMG_WIDTH, 3)
+    ).astype(np.float32)
+
+    expected = np.asarray(KerasBackend(keras_path).predict(batch))
+    expected_codes = expected.argmax(axis=-1)
+
+    ok = True
+    for backend_cls in (OnnxRuntimeBackend, OpenCVDnnBackend):
+        try:
+            backend = backend_cls(onnx_path)
+        except ImportError as exc:
+            print(f"[{backend_cls.name}] 跳过: {exc}")
+            continue
+
+        actual = np.asarray(backend.predict(batch)).reshape(expected.shape)
+        max_diff = float(np.max(np.abs(actual - expected)))
+        same_codes = bool(np.array_equal(actual.argmax(axis=-1), expected_codes))
+        passed = max_diff <= atol and same_codes
+        ok = ok and passed
+        print(
+            f"[{backend_cls.name}] 最大误差: {max_diff:.2e}, "
+            f"识别结果一致: {same_codes}, {'通过' if passed else '未通过'}"
+        )
+    return ok
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="导出验证码模型为 ONNX")
+    parser.add_argument("--keras", default=str(KerasBackend.default_model), help="Keras 模型路径")
+    parser.add_argument("--output", default=str(OnnxRuntimeBackend.default_model), help="ONNX 输出路径")
+    parser.add_argument("--opset", type=int, default=13, help="ONNX opset 版本")
+    parser.add_argument("--skip-check", action="store_true", help="跳过与 Keras 的一致性校验")
+    args = parser.parse_args(argv)
+
+    export(args.keras, args.output, opset=args.opset)
+    if args.skip_check:
+        return 0
+    return 0 if check_parity(args.keras, args.output) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""
+用线上采集的验证码样本微调模型
+
+从 CAPTCHA_DATASET_DIR 采集的样本中取登录通过（标签已确认）的部分，按样本偏移量哈希划出留出集；
+训练数据按 batch 从 memmap 读取并经 img_process_norm 预处理，与线上推理的输入完全一致。
+微调后在留出集上用 word_acc 与原模型比较，只有整词准确率提高才替换模型文件。
+
+用法:
+    python -m captcha.finetune artifacts/captcha-dataset [--model models/VGG.keras] [--epochs 3]
+
+替换 Keras 模型后，使用 onnx / opencv 后端时需要重新运行 python -m captcha.export_onnx。
+"""
+import argparse
+import math
+import os
+import sys
+
+import numpy as np
+
+from .backends import KerasBackend
+from .dataset import CaptchaDataset
+from .image_process import img_process_norm
+from .label_process import WORDLIST
+from .recognizer import CaptchaRecognizer
+
+
+def split(records: np.ndarray, holdout: float, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    按样本在 images.bin 中的偏移量哈希划分训练集与留出集。
+    每个样本的归属只取决于自身，数据集追加新样本后，旧样本不会在训练集与留出集之间来回变动。
+
+    Returns:
+        (训练集记录, 留出集记录)
+    """
+    hashed = (records["offset"] ^ np.uint64(seed)) * np.uint64(0x9E3779B97F4A7C15) >> np.uint64(40)
+    in_holdout = hashed < np.uint64(holdout * (1 << 24))
+    return records[~in_holdout], records[in_holdout]
+
+
+def encode_labels(labels: np.ndarray) -> np.ndarray:
+    """
+    标签转为 one-hot
+
+    Args:
+        labels: dtype 为 S4 的 4 位数字标签
+
+    Returns:
+        shape 为 (batch_size, 4, 10) 的 float32 数组
+    """
+    digits = np.frombuffer(np.ascontiguousarray(labels, dtype="S4").tobytes(), dtype=np.uint8).reshape(-1, 4)
+    return np.eye(len(WORDLIST), dtype=np.float32)[digits - ord("0")]
+
+
+def make_sequence(dataset: CaptchaDataset, records: np.ndarray, batch_size: int, shuffle: bool = False):
+    """按 batch 读取并预处理样本，供 model.fit / model.evaluate 使用"""
+    from keras.utils import PyDataset
+
+    class CaptchaSequence(PyDataset):
+        def __init__(self):
+            super().__init__()
+            self.order = np.arange(len(records))
+
+        def __len__(self):
+            return math.ceil(len(records) / batch_size)
+
+        def __getitem__(self, index):
+            batch_records = records[self.order[index * batch_size:(index + 1) * batch_size]]
+            batch = np.empty(
+                (len(batch_records), CaptchaRecognizer.IMG_HEIGHT, CaptchaRecognizer.IMG_WIDTH, 3),
+                dtype=np.float32,
+            )
+            for img, row in zip(dataset.images(batch_records), batch):
+                img_process_norm(img, shape=(CaptchaRecognizer.IMG_WIDTH, CaptchaRecognizer.IMG_HEIGHT), out=row)
+            return batch, encode_labels(batch_records["label"])
+
+        def on_epoch_end(self):
+            if shuffle:
+                np.random.shuffle(self.order)
+
+    return CaptchaSequence()
+
+
+def evaluate(model, sequence) -> float:
+    """留出集上的 word_acc"""
+    return float(model.evaluate(sequence, verbose=0, return_dict=True)["word_acc"])
+
+
+def finetune(
+    dataset_dir: str,
+    model_path: str,
+    output_path: str,
+    epochs: int = 3,
+    batch_size: int = 32,
+    learning_rate: float = 1e-4,
+    holdout: float = 0.2,
+    min_samples: int = 100,
+    seed: int = 0,
+) -> bool:
+    """
+    微调并在留出集准确率提高时写出新模型
+
+    Returns:
+        是否替换了模型
+    """
+    dataset = CaptchaDataset(dataset_dir)
+    print(dataset.summary())
+    # 复制出来，之后数据集继续追加也不影响本次训练
+    records = np.array(dataset.labeled())
+    records = records[np.char.isdigit(records["label"])]
+    if len(records) < min_samples:
+        print(f"已确认标签的样本不足 {min_samples} 个，暂不微调")
+        return False
+
+    train_records, holdout_records = split(records, holdout, seed)
+    if not len(train_records) or not len(holdout_records):
+        print("训练集或留出集为空，请调整 --holdout")
+        return False
+    holdout_sequence = make_sequence(dataset, holdout_records, batch_size)
+    print(f"训练 {len(train_records)} 个，留出 {len(holdout_records)} 个")
+
+    baseline = evaluate(_compile(KerasBackend(model_path).model, learning_rate), holdout_sequence)
+    print(f"原模型留出集 word_acc: {baseline:.4f}")
+
+    model = _compile(KerasBackend(model_path).model, learning_rate)
+    model.fit(make_sequence(dataset, train_records, batch_size, shuffle=True), epochs=epochs, verbose=2)
+    score = evaluate(model, holdout_sequence)
+    print(f"微调后留出集 word_acc: {score:.4f}")
+
+    if score <= baseline:
+        print("准确率没有提高，保留原模型")
+        return False
+
+    # 先写临时文件再替换，运行中的进程不会读到写了一半的模型
+    tmp_path = f"{output_path}.tmp.keras"
+    model.save(tmp_path)
+    os.replace(tmp_path, output_path)
+    print(f"已更新模型: {output_path}，如使用 onnx / opencv 后端请重新导出 ONNX")
+    return True
+
+
+def _compile(model, learning_rate: float):
+    from keras.optimizers import Adam
+
+    from .model_utils import word_acc
+
+    model.compile(
+        optimizer=Adam(learning_rate=learning_rate),
+        loss="categorical_crossentropy",
+        metrics=[word_acc],
+    )
+    return model
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="用线上采集的验证码样本微调模型")
+    parser.add_argument("dataset", help="样本目录，即 CAPTCHA_DATASET_DIR")
+    parser.add_argument("--model", default=str(KerasBackend.default_model), help="原 Keras 模型路径")
+    parser.add_argument("--output", default="", help="新模型路径，默认覆盖原模型")
+    parser.add_argument("--epochs", type=int, default=3, help="训练轮数")
+    parser.add_argument("--batch-size", type=int, default=32, help="batch 大小")
+    parser.add_argument("--learning-rate", type=float, default=1e-4, help="学习率")
+    parser.add_argument("--holdout", type=float, default=0.2, help="留出集比例")
+    parser.add_argument("--min-samples", type=int, default=100, help="已确认标签的样本数达到该值才微调")
+    parser.add_argument("--seed", type=int, default=0, help="划分留出集的随机种子")
+    args = parser.parse_args(argv)
+
+    finetune(
+        args.dataset,
+        args.model,
+        args.output or args.model,
+        epochs=args.epochs,
+        batch_size=args.batch_size,
+        learning_rate=args.learning_rate,
+        holdout=args.holdout,
+        min_samples=args.min_samples,
+        seed=args.seed,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
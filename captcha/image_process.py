@@ -1,21 +1,27 @@
 import cv2
+import numpy as np
 
 
-def img_process_norm(img, shape):
+def img_process_norm(img, shape, out=None):
     """
     验证码图像预处理
 
     Args:
         img: BGR 格式的图像 (numpy array)
         shape: 目标尺寸 (width, height)
+        out: 可选的输出数组，形状为 (height, width, 3)，如预分配 batch 缓冲区中的一行；
+             传入时结果直接写入其中，不再分配新数组
 
     Returns:
-        处理后的图像，形状为 (height, width, 3)，值范围 [0, 1]
+        处理后的图像，形状为 (height, width, 3)，像素值为 0~255
     """
     # 中值滤波降噪
     res = cv2.medianBlur(img, ksize=3)
     # 调整大小
     res = cv2.resize(src=res, dsize=shape)
-    # 归一化到 [0, 1]
-    cv2.normalize(src=res, dst=res, alpha=0, beta=1, norm_type=cv2.NORM_MINMAX, dtype=cv2.CV_32F)
-    return res
\ No newline at end of file
+    # 原先这里有一步 cv2.normalize(dst=res, dtype=CV_32F)，由于 dst 类型不符 OpenCV 会另行分配，
+    # 结果被丢弃，模型实际拿到的一直是 0~255 的像素值。保持这一输入，去掉这次无效的计算。
+    if out is None:
+        return res
+    np.copyto(out, res, casting="unsafe")
+    return out
@@ -1,7 +1,25 @@
+from dataclasses import dataclass, field
+
 import numpy as np
 
 WORDLIST = list('0123456789')
 
+# 类别下标到字符编码的查找表，整批结果一次查表转成字符串
+_LOOKUP = np.array([ord(c) for c in WORDLIST], dtype=np.uint8)
+
+
+@dataclass(frozen=True)
+class CaptchaResult:
+    """带置信度的识别结果"""
+
+    code: str
+    # 每一位的概率
+    digit_confidences: list[float]
+    # 整体置信度，各位概率之积
+    confidence: float
+    # 按概率从高到低的候选结果 [(code, probability), ...]，第一个即 code 本身
+    alternatives: list[tuple[str, float]] = field(default_factory=list)
+
 
 def decode(arr):
     """
@@ -13,10 +31,7 @@ def decode(arr):
     Returns:
         4 位数字字符串
     """
-    arr = arr.tolist()
-    idx = list(np.argmax(arr, axis=1))
-    result = ''.join(WORDLIST[i] for i in idx)
-    return result
+    return decode_predict(np.asarray(arr)[np.newaxis])[0]
 
 
 def decode_predict(predict):
@@ -29,4 +44,73 @@ def decode_predict(predict):
     Returns:
         解码后的字符串列表
     """
-    return [decode(arr) for arr in predict]
\ No newline at end of file
+    return _indices_to_codes(np.asarray(predict).argmax(axis=-1))
+
+
+def decode_with_confidence(arr, top_k=3):
+    """
+    解码单个预测结果，并给出置信度与 top-k 候选
+
+    Args:
+        arr: shape 为 (4, 10) 的二维数组，每行为该位的概率分布
+        top_k: 返回的候选数量
+
+    Returns:
+        CaptchaResult
+    """
+    return decode_predict_with_confidence(np.asarray(arr)[np.newaxis], top_k=top_k)[0]
+
+
+def decode_predict_with_confidence(predict, top_k=3):
+    """
+    批量解码预测结果，并给出置信度与 top-k 候选，整批向量化计算
+
+    Args:
+        predict: shape 为 (batch_size, 4, 10) 的三维数组
+        top_k: 每个结果返回的候选数量
+
+    Returns:
+        CaptchaResult 列表
+    """
+    probs = np.asarray(predict, dtype=np.float64)
+    batch_size, length, classes = probs.shape
+
+    idx = probs.argmax(axis=-1)
+    digit_confidences = np.take_along_axis(probs, idx[..., np.newaxis], axis=-1)[..., 0]
+    confidences = digit_confidences.prod(axis=-1)
+    codes = _indices_to_codes(idx)
+
+    # 各位相互独立，逐位保留概率最高的 top_k 个前缀即可得到精确的 top_k 整体结果
+    scores = np.ones((batch_size, 1))
+    paths = np.zeros((batch_size, 1, 0), dtype=np.int64)
+    for pos in range(length):
+        candidates = (scores[:, :, np.newaxis] * probs[:, np.newaxis, pos, :]).reshape(batch_size, -1)
+        order = np.argsort(-candidates, axis=-1, kind="stable")[:, :top_k]
+        beam, digit = np.divmod(order, classes)
+        paths = np.concatenate(
+            [np.take_along_axis(paths, beam[..., np.newaxis], axis=1), digit[..., np.newaxis]], axis=-1
+        )
+        scores = np.take_along_axis(candidates, order, axis=-1)
+
+    alternative_codes = _indices_to_codes(paths.reshape(-1, length))
+    width = paths.shape[1]
+
+    return [
+        CaptchaResult(
+            code=codes[i],
+            digit_confidences=digit_confidences[i].tolist(),
+            confidence=float(confidences[i]),
+            alternatives=list(zip(alternative_codes[i * width:(i + 1) * width], scores[i].tolist())),
+        )
+        for i in range(batch_size)
+    ]
+
+
+def _indices_to_codes(idx):
+    """(batch_size, 4) 的类别下标转成字符串列表"""
+    idx = np.asarray(idx)
+    if idx.size == 0:
+        return [""] * len(idx)
+    length = idx.shape[-1]
+    raw = _LOOKUP[idx].tobytes().decode("ascii")
+    return [raw[i:i + length] for i in range(0, len(raw), length)]
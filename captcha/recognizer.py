@@ -1,13 +1,13 @@
 import os
-from pathlib import Path
+import threading
+from contextlib import nullcontext
 
 import cv2
 import numpy as np
-from keras.models import load_model
 
+from .backends import DEFAULT_BACKEND, create_backend
 from .image_process import img_process_norm
-from .label_process import decode_predict
-from .model_utils import word_acc
+from .label_process import CaptchaResult, decode_predict_with_confidence
 
 
 class CaptchaRecognizer:
@@ -17,29 +17,49 @@ class CaptchaRecognizer:
     IMG_WIDTH = 128
     IMG_HEIGHT = 32
 
-    def __init__(self, model_path: str = None):
+    def __init__(self, model_path: str = None, backend: str = None, span=None):
         """
         初始化识别器
 
         Args:
-            model_path: 模型文件路径，默认使用项目 models/VGG.keras
+            model_path: 模型文件路径，默认使用后端对应的 models 下的文件
+            backend: 推理后端 keras / onnx / opencv，默认读取环境变量 CAPTCHA_BACKEND
+            span: 计时钩子，span(name) 返回上下文管理器，用于统计预处理、推理、解码耗时
         """
-        if model_path is None:
-            model_path = Path(__file__).parent.parent / "models" / "VGG.keras"
+        self.span = span or (lambda name: nullcontext())
+        if backend is None:
+            backend = os.environ.get("CAPTCHA_BACKEND", DEFAULT_BACKEND)
 
-        self.model_path = str(model_path)
+        self.backend_name = backend.strip().lower()
+        self.model_path = None if model_path is None else str(model_path)
         self._model = None
+        # 多线程共用同一个识别器时，模型加载与推理都需要串行
+        self._lock = threading.RLock()
+        self._local = threading.local()
 
     @property
     def model(self):
-        """懒加载模型"""
+        """懒加载推理后端"""
         if self._model is None:
-            self._model = load_model(
-                self.model_path,
-                custom_objects={"word_acc": word_acc}
-            )
+            with self._lock:
+                if self._model is None:
+                    self._model = create_backend(self.backend_name, self.model_path)
         return self._model
 
+    def _predict(self, batch):
+        """线程安全的推理"""
+        with self._lock:
+            return self.model.predict(batch)
+
+    def warmup(self) -> None:
+        """
+        预热：加载模型并用空白图片跑一次推理，
+        让首次识别验证码时不再承担模型加载与计算图构建的开销
+        """
+        batch = self._batch_buffer(1)
+        batch.fill(0)
+        self._predict(batch)
+
     def recognize(self, image_path: str) -> str:
         """
         识别验证码图片
@@ -50,55 +70,113 @@ class CaptchaRecognizer:
         Returns:
             识别出的 4 位数字字符串
         """
+        return self.recognize_detailed(image_path).code
+
+    def recognize_from_bytes(self, image_bytes: bytes) -> str:
+        """
+        从字节数据识别验证码
+
+        Args:
+            image_bytes: 图片的字节数据
+
+        Returns:
+            识别出的 4 位数字字符串
+        """
+        return self.recognize_detailed_from_bytes(image_bytes).code
+
+    def recognize_detailed(self, image_path: str, top_k: int = 3) -> CaptchaResult:
+        """
+        识别验证码图片，返回置信度与候选结果
+
+        Args:
+            image_path: 验证码图片路径
+            top_k: 候选结果数量
+
+        Returns:
+            CaptchaResult
+        """
         # 读取图片 (BGR 格式)
         img = cv2.imread(image_path)
         if img is None:
             raise ValueError(f"无法读取图片: {image_path}")
+        return self.recognize_images([img], top_k=top_k)[0]
 
-        # 预处理
-        processed = img_process_norm(
-            img,
-            shape=(self.IMG_WIDTH, self.IMG_HEIGHT)
-        )
+    def recognize_detailed_from_bytes(self, image_bytes: bytes, top_k: int = 3) -> CaptchaResult:
+        """
+        从字节数据识别验证码，返回置信度与候选结果
 
-        # 添加 batch 维度
-        batch = np.array([processed])
+        Args:
+            image_bytes: 图片的字节数据
+            top_k: 候选结果数量
 
-        # 推理
-        predict = self.model.predict(batch, verbose=0)
+        Returns:
+            CaptchaResult
+        """
+        return self.recognize_images([decode_image(image_bytes)], top_k=top_k)[0]
 
-        # 解码
-        result = decode_predict(predict)
-        return result[0]
+    def recognize_batch(self, images: list[bytes], top_k: int = 3) -> list[CaptchaResult]:
+        """
+        批量识别验证码，所有图片一次推理
 
-    def recognize_from_bytes(self, image_bytes: bytes) -> str:
+        Args:
+            images: 图片字节数据列表
+            top_k: 候选结果数量
+
+        Returns:
+            与输入顺序一致的 CaptchaResult 列表
         """
-        从字节数据识别验证码
+        return self.recognize_images([decode_image(image_bytes) for image_bytes in images], top_k=top_k)
+
+    def recognize_images(self, images: list, top_k: int = 3) -> list[CaptchaResult]:
+        """
+        对已解码的 BGR 图像做预处理、一次批量推理并解码，所有识别入口最终都走这里
 
         Args:
-            image_bytes: 图片的字节数据
+            images: BGR 格式的图像列表
+            top_k: 候选结果数量
 
         Returns:
-            识别出的 4 位数字字符串
+            与输入顺序一致的 CaptchaResult 列表
         """
-        # 从字节解码图片
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        if img is None:
-            raise ValueError("无法解码图片数据")
+        if not images:
+            return []
 
-        # 预处理
-        processed = img_process_norm(
-            img,
-            shape=(self.IMG_WIDTH, self.IMG_HEIGHT)
-        )
+        # 预处理结果直接写入本线程复用的 float32 缓冲区，不再逐张分配再拼接
+        with self.span("captcha.preprocess"):
+            batch = self._batch_buffer(len(images))
+            for img, row in zip(images, batch):
+                img_process_norm(img, shape=(self.IMG_WIDTH, self.IMG_HEIGHT), out=row)
 
-        # 添加 batch 维度
-        batch = np.array([processed])
+        with self.span("captcha.predict"):
+            predict = self._predict(batch)
 
-        # 推理
-        predict = self.model.predict(batch, verbose=0)
+        with self.span("captcha.decode"):
+            return decode_predict_with_confidence(predict, top_k=top_k)
 
-        # 解码
-        result = decode_predict(predict)
-        return result[0]
+    def _batch_buffer(self, size: int) -> np.ndarray:
+        """
+        返回本线程的预分配输入缓冲区的前 size 行，容量不足时按需扩大
+
+        缓冲区按线程隔离，多个线程同时预处理不会互相覆盖；推理结果是新数组，缓冲区用完即可复用。
+        """
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None or len(buffer) < size:
+            buffer = np.empty((size, self.IMG_HEIGHT, self.IMG_WIDTH, 3), dtype=np.float32)
+            self._local.buffer = buffer
+        return buffer[:size]
+
+
+def decode_image(image_bytes: bytes) -> np.ndarray:
+    """
+    把图片字节数据解码为 BGR 图像
+
+    Args:
+        image_bytes: 图片的字节数据
+
+    Returns:
+        BGR 格式的图像
+    """
+    img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("无法解码图片数据")
+    return img
@@ -0,0 +1,125 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from .label_process import CaptchaResult
+from .recognizer import CaptchaRecognizer, decode_image
+
+_STOP = object()
+
+
+class InferenceWorker:
+    """
+    微批推理线程
+
+    多个线程同时请求识别时，在一个很短的时间窗口内收集请求，合并成一个 batch
+    只调用一次模型，再把结果分发给各自的 Future。模型只会在这一个线程里被调用。
+    接口与 CaptchaRecognizer 的 recognize_from_bytes / recognize_detailed_from_bytes 一致，可直接替换。
+    """
+
+    def __init__(
+        self,
+        recognizer: CaptchaRecognizer,
+        window_ms: int = 5,
+        max_batch: int = 32,
+        max_queue: int = 64,
+    ):
+        """
+        Args:
+            recognizer: 实际执行推理的识别器
+            window_ms: 收到第一个请求后继续等待合批的时间
+            max_batch: 单次推理的最大图片数
+            max_queue: 等待队列上限，队列满时提交方阻塞
+        """
+        self.recognizer = recognizer
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._loop, name="captcha-inference", daemon=True)
+        self._thread.start()
+
+    def submit(self, image_bytes: bytes, top_k: int = 3) -> "Future[CaptchaResult]":
+        """
+        提交一张图片，返回识别结果的 Future
+
+        Args:
+            image_bytes: 图片的字节数据
+            top_k: 候选结果数量
+        """
+        future: Future = Future()
+        self._queue.put((image_bytes, top_k, future))
+        return future
+
+    def recognize_detailed_from_bytes(self, image_bytes: bytes, top_k: int = 3) -> CaptchaResult:
+        return self.submit(image_bytes, top_k=top_k).result()
+
+    def recognize_from_bytes(self, image_bytes: bytes) -> str:
+        return self.recognize_detailed_from_bytes(image_bytes).code
+
+    def warmup(self) -> None:
+        self.recognizer.warmup()
+
+    def close(self) -> None:
+        """处理完已提交的请求后停止线程"""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            stopping = False
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._run_batch(batch)
+            if stopping:
+                return
+
+    def _run_batch(self, batch: list) -> None:
+        # 单张图片解码失败只影响它自己的 Future
+        images, pending = [], []
+        for image_bytes, top_k, future in batch:
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                images.append(decode_image(image_bytes))
+                pending.append((top_k, future))
+            except Exception as exc:
+                future.set_exception(exc)
+
+        if not pending:
+            return
+
+        try:
+            # 候选数量按本批最大值解码，再按各自的 top_k 截断
+            results = self.recognizer.recognize_images(images, top_k=max(top_k for top_k, _ in pending))
+        except Exception as exc:
+            for _, future in pending:
+                future.set_exception(exc)
+            return
+
+        for (top_k, future), result in zip(pending, results):
+            future.set_result(
+                CaptchaResult(
+                    code=result.code,
+                    digit_confidences=result.digit_confidences,
+                    confidence=result.confidence,
+                    alternatives=result.alternatives[:top_k],
+                )
+            )
@@ -1,5 +1,35 @@
-from autobond import run
+import argparse
+
+from autobond import run, run_daemon
 
 
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser(description="东方财富自动新债申购")
+    parser.add_argument("--daemon", action="store_true", help="常驻运行，按 SCHEDULE_TIMES 定时申购")
+    parser.add_argument("--processes", type=int, default=0, help="本机启动多个分片进程，结果合并后统一推送")
+    parser.add_argument("--shard", default="", help="只运行第 i 个分片，格式 i/N，用于多台机器分摊账号")
+    parser.add_argument("--results-file", default="", help="分片结果写入的 JSON 文件，供 --merge 汇总")
+    parser.add_argument("--no-notify", action="store_true", help="分片运行时不推送，由 --merge 统一推送")
+    parser.add_argument("--merge", nargs="+", metavar="FILE", help="汇总各分片的结果文件并推送")
+    args = parser.parse_args()
+
+    if args.daemon:
+        run_daemon()
+    elif args.merge:
+        from autobond.sharding import merge
+
+        merge(args.merge)
+    elif args.shard:
+        from autobond.sharding import parse_shard, run_shard
+
+        try:
+            index, count = parse_shard(args.shard)
+        except ValueError as exc:
+            parser.error(str(exc))
+        run_shard(index, count, results_file=args.results_file, notify=not args.no_notify)
+    elif args.processes > 1:
+        from autobond.sharding import run_processes
+
+        run_processes(args.processes)
+    else:
+        run()